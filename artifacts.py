@@ -0,0 +1,192 @@
+"""Load-once registry for the serving artifacts, shared by both Flask servers.
+
+Paths resolve relative to this file, so the servers no longer depend on the
+working directory. Every artifact is loaded at most once per process, can be
+warmed up with a dummy inference, and has its load/warmup time recorded.
+"""
+import os
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PROCESSING_DIR = os.path.join(ROOT_DIR, "ml-model", "Data-Processing-Script")
+TRAINED_MODEL_DIR = os.path.join(ROOT_DIR, "ml-model", "Trained-Model")
+
+MODEL_PATH = os.path.join(TRAINED_MODEL_DIR, "final_30_features_model.h5")
+SCALER_PATH = os.path.join(TRAINED_MODEL_DIR, "standard_scaler.pkl")
+PYCARET_MODEL_PATH = os.path.join(TRAINED_MODEL_DIR, "phishingdetection")  # load_model appends .pkl
+# Memory-mappable export of the numpy backend, rebuilt whenever the .h5 or the scaler changes
+NUMPY_MODEL_DIR = os.environ.get("NUMPY_MODEL_DIR", os.path.join(TRAINED_MODEL_DIR, "numpy_mlp"))
+TRAINING_DATASET_PATH = os.path.join(ROOT_DIR, "ml-model", "Training-Dataset", "training_dataset_1.csv")
+# Memory-mapped known-URL / known-host index, rebuilt from whichever of its sources changed
+REPUTATION_INDEX_DIR = os.environ.get("REPUTATION_INDEX_DIR", os.path.join(TRAINED_MODEL_DIR, "reputation_index"))
+
+if DATA_PROCESSING_DIR not in sys.path:
+    sys.path.append(DATA_PROCESSING_DIR)
+
+# Process start, as close to interpreter start as the first import of this module gets
+PROCESS_STARTED = time.perf_counter()
+
+
+class ArtifactRegistry:
+    """Named artifacts loaded lazily, once, behind a (re-entrant: loaders may depend on each other) lock"""
+
+    def __init__(self):
+        self._loaders = {}
+        self._warmups = {}
+        self._artifacts = {}
+        self._timings = {}
+        self._lock = threading.RLock()
+        self.ready_seconds = None
+        self.first_request_seconds = None
+
+    def register(self, name, loader, warmup=None):
+        self._loaders[name] = loader
+        if warmup is not None:
+            self._warmups[name] = warmup
+
+    def get(self, name):
+        if name in self._artifacts:
+            return self._artifacts[name]
+        with self._lock:
+            if name not in self._artifacts:
+                started = time.perf_counter()
+                artifact = self._loaders[name]()
+                self._timings.setdefault(name, {})["load_seconds"] = time.perf_counter() - started
+                self._artifacts[name] = artifact
+        return self._artifacts[name]
+
+    def warmup(self, name):
+        """Load the artifact and run its warmup inference so the first request does not pay for it"""
+        artifact = self.get(name)
+        warmup = self._warmups.get(name)
+        if warmup is not None:
+            started = time.perf_counter()
+            warmup(artifact)
+            self._timings[name]["warmup_seconds"] = time.perf_counter() - started
+        return artifact
+
+    def mark_ready(self):
+        self.ready_seconds = time.perf_counter() - PROCESS_STARTED
+
+    def record_request(self, seconds):
+        if self.first_request_seconds is None:
+            self.first_request_seconds = seconds
+
+    def report(self):
+        return {
+            "artifacts": {name: dict(timings) for name, timings in self._timings.items()},
+            "startup_seconds": self.ready_seconds,
+            "first_request_seconds": self.first_request_seconds,
+        }
+
+
+def track_first_request(app, registry):
+    """Record the latency of the first request served by a Flask app"""
+    from flask import g
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request_time(response):
+        if registry.first_request_seconds is None and "request_started" in g:
+            registry.record_request(time.perf_counter() - g.request_started)
+        return response
+
+
+def _load_scaler():
+    import joblib
+    return joblib.load(SCALER_PATH)
+
+
+def _load_keras_model():
+    import tensorflow as tf
+    return tf.keras.models.load_model(MODEL_PATH)
+
+
+def _load_numpy_model():
+    from numpy_inference import NumpyMLP
+    # The scaler is folded into the first layer, so this model takes raw features.
+    # Weights are memory-mapped from NUMPY_MODEL_DIR so worker processes share one read-only copy.
+    sources = [MODEL_PATH, SCALER_PATH]
+    try:
+        if not NumpyMLP.export_is_current(NUMPY_MODEL_DIR, sources):
+            NumpyMLP.load(MODEL_PATH, scaler=registry.get("scaler")).save(NUMPY_MODEL_DIR, sources=sources)
+        return NumpyMLP.load_arrays(NUMPY_MODEL_DIR)
+    except OSError as e:
+        print("❌ Could not use the memory-mapped model export, loading it in memory:", e)
+        return NumpyMLP.load(MODEL_PATH, scaler=registry.get("scaler"))
+
+
+def reputation_sources():
+    """(kind, path) sources of the reputation index: REPUTATION_DATASETS, REPUTATION_ALLOWLIST and
+    REPUTATION_DENYLIST, each a list of paths separated by os.pathsep"""
+    def paths(name, default=""):
+        return [path for path in os.environ.get(name, default).split(os.pathsep) if path]
+    return ([("dataset", path) for path in paths("REPUTATION_DATASETS", TRAINING_DATASET_PATH)]
+            + [("allow", path) for path in paths("REPUTATION_ALLOWLIST")]
+            + [("deny", path) for path in paths("REPUTATION_DENYLIST")])
+
+
+def _load_reputation_index():
+    from reputation_index import ReputationIndex
+    try:
+        return ReputationIndex.build(REPUTATION_INDEX_DIR, reputation_sources())
+    except PermissionError as e:
+        print("❌ Could not write the reputation index, building it in memory:", e)
+        return ReputationIndex.build(None, reputation_sources())
+
+
+def _load_pca():
+    from featureExtractor import loadPCA
+    return loadPCA()
+
+
+def _load_pycaret_model():
+    from pycaret.classification import load_model
+    return load_model(PYCARET_MODEL_PATH)
+
+
+def _load_compiled_pipeline():
+    from compiled_pipeline import CompiledPipeline
+    from featureExtractor import FEATURE_NAMES
+    return CompiledPipeline.from_pipeline(registry.get("phishingdetection"), FEATURE_NAMES)
+
+
+def _warmup_keras_model(model):
+    import numpy as np
+    model.predict(np.zeros((1, 30)), verbose=0)
+
+
+def _warmup_numpy_model(model):
+    import numpy as np
+    model.predict(np.zeros((1, 30)))
+
+
+def _warmup_pca(pca):
+    import pandas as pd
+    pca.transform(pd.DataFrame([[1, 1, 1]], columns=["iFrame", "Web_Forwards", "Mouse_Over"]))
+
+
+def _warmup_pycaret_model(model):
+    import pandas as pd
+    from featureExtractor import FEATURE_NAMES
+    model.predict(pd.DataFrame([[0] * len(FEATURE_NAMES)], columns=FEATURE_NAMES))
+
+
+def _warmup_compiled_pipeline(model):
+    import numpy as np
+    model.predict(np.zeros((1, len(model.feature_names))))
+
+
+registry = ArtifactRegistry()
+registry.register("scaler", _load_scaler)
+registry.register("keras_model", _load_keras_model, warmup=_warmup_keras_model)
+registry.register("numpy_model", _load_numpy_model, warmup=_warmup_numpy_model)
+registry.register("reputation_index", _load_reputation_index)
+registry.register("pca", _load_pca, warmup=_warmup_pca)
+registry.register("phishingdetection", _load_pycaret_model, warmup=_warmup_pycaret_model)
+registry.register("phishingdetection_compiled", _load_compiled_pipeline, warmup=_warmup_compiled_pipeline)
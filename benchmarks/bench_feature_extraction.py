@@ -0,0 +1,96 @@
+"""Parity check and microbenchmark for the URL feature extractors.
+
+Compares, bit-for-bit on every URL in the training CSV, the single-pass
+extract_enhanced_features against extract_enhanced_features_reference and the
+columnar extract_enhanced_features_batch / extract_url_features_batch against
+their per-URL functions, then times them.
+
+    python benchmarks/bench_feature_extraction.py [training_dataset.csv] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT_DIR, "ml-model", "Data-Processing-Script"))
+from preprocess_data_30_feature import (
+    extract_enhanced_features, extract_enhanced_features_batch, extract_enhanced_features_reference,
+)
+from preprocess_data import URL_FEATURE_NAMES, extract_url_features, extract_url_features_batch
+
+DEFAULT_DATASET = os.path.join(ROOT_DIR, "ml-model", "Training-Dataset", "training_dataset_1.csv")
+
+
+def _bits(features):
+    # float.hex() distinguishes every bit pattern, unlike == (0.0 vs -0.0)
+    if isinstance(features, list):
+        return [x.hex() if isinstance(x, float) else (type(x), x) for x in features]
+    return features
+
+
+def check_parity(urls):
+    mismatches = [url for url in urls
+                  if _bits(extract_enhanced_features(url)) != _bits(extract_enhanced_features_reference(url))]
+    return mismatches
+
+
+def check_batch_parity(urls):
+    """Rows where the columnar extractors differ from the per-URL ones (float64 bits / exact ints)"""
+    enhanced = np.array([row if isinstance(row, list) else [0.0] * 30
+                         for row in map(extract_enhanced_features, urls)], dtype=np.float64)
+    enhanced_batch = extract_enhanced_features_batch(pd.Series(urls)).to_numpy()
+    basic = np.array([[extract_url_features(url)[name] for name in URL_FEATURE_NAMES] for url in urls])
+    basic_batch = extract_url_features_batch(pd.Series(urls)).to_numpy()
+
+    differs = ((enhanced.view(np.uint64) != enhanced_batch.view(np.uint64)).any(axis=1)
+               | (basic != basic_batch).any(axis=1))
+    return [urls[i] for i in np.flatnonzero(differs)]
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def time_extractor(extractor, urls, repeat):
+    return best_time(lambda: [extractor(url) for url in urls], repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("dataset", nargs="?", default=DEFAULT_DATASET)
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per extractor; the best is reported")
+    args = parser.parse_args()
+
+    urls = pd.read_csv(args.dataset)["url"].tolist()
+
+    mismatches = check_parity(urls)
+    print(f"Parity (single-pass): {len(urls) - len(mismatches)}/{len(urls)} URLs identical")
+    for url in mismatches[:10]:
+        print("  mismatch:", url)
+    batch_mismatches = check_batch_parity(urls)
+    print(f"Parity (columnar):    {len(urls) - len(batch_mismatches)}/{len(urls)} URLs identical")
+    for url in batch_mismatches[:10]:
+        print("  mismatch:", url)
+
+    column = pd.Series(urls)
+    reference = time_extractor(extract_enhanced_features_reference, urls, args.repeat)
+    fast = time_extractor(extract_enhanced_features, urls, args.repeat)
+    columnar = best_time(lambda: extract_enhanced_features_batch(column), args.repeat)
+    print(f"reference:   {reference * 1e6 / len(urls):8.2f} us/URL")
+    print(f"single-pass: {fast * 1e6 / len(urls):8.2f} us/URL  ({reference / fast:.2f}x)")
+    print(f"columnar:    {columnar * 1e6 / len(urls):8.2f} us/URL  ({reference / columnar:.2f}x)")
+
+    sys.exit(1 if mismatches or batch_mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Parity check and scaling benchmark for the shortener / sensitive-word matchers.
+
+Checks ef.tinyURL and ef.sensitive_word against the original regex and
+substring-loop implementations on the training URLs, then times the
+Aho-Corasick matcher with synthetic pattern lists of growing size.
+
+    python benchmarks/bench_pattern_matching.py [training_dataset.csv]
+"""
+import os
+import random
+import re
+import string
+import sys
+import time
+from urllib.parse import urlparse
+
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT_DIR, "ml-model", "Data-Processing-Script"))
+import extractorFunctions as ef
+from patternMatcher import AhoCorasick
+
+DEFAULT_DATASET = os.path.join(ROOT_DIR, "ml-model", "Training-Dataset", "training_dataset_1.csv")
+
+
+def regex_tiny_url(url):
+    return 1 if re.search(ef.shortening_services, url) else 0
+
+
+def loop_sensitive_word(url):
+    domain = urlparse(url).netloc
+    return 1 if any(word in domain for word in ef.sensitiveWords) else 0
+
+
+def main():
+    dataset = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATASET
+    urls = pd.read_csv(dataset)["url"].tolist()
+
+    tiny_mismatches = sum(regex_tiny_url(url) != ef.tinyURL(url) for url in urls)
+    sensitive_mismatches = sum(loop_sensitive_word(url) != ef.sensitive_word(url) for url in urls)
+    print(f"tinyURL mismatches: {tiny_mismatches}  sensitive_word mismatches: {sensitive_mismatches}")
+
+    random.seed(0)
+    for size in [len(ef.shorteningServices), 1000, 10000, 50000]:
+        patterns = ["".join(random.choices(string.ascii_lowercase, k=random.randint(4, 12))) + random.choice([".com", ".ly", ".io"])
+                    for _ in range(size)]
+        started = time.perf_counter()
+        matcher = AhoCorasick(patterns)
+        built = time.perf_counter() - started
+        started = time.perf_counter()
+        for url in urls:
+            matcher.search(url)
+        per_url = (time.perf_counter() - started) / len(urls)
+        print(f"{size:6d} patterns: build {built:6.2f} s, {per_url * 1e6:6.2f} us/URL")
+
+    sys.exit(1 if tiny_mismatches or sensitive_mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
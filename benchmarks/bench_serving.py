@@ -0,0 +1,301 @@
+"""Latency / throughput benchmark suite for the serving hot path.
+
+On URLs from the training CSV, measures p50/p95/p99 latency and requests per
+second of:
+
+    extract_enhanced_features    30-feature lexical extraction used by /predict
+    featureExtraction            10-feature extraction used by /prediction, with the
+                                 WHOIS lookup and page fetch served by local stand-ins
+    predict_proba[1] / [64]      scaler + model.predict for one row / a 64-row batch
+    /predict, /prediction        the full routes through Flask's test client, once
+                                 per --concurrency level
+
+Prediction caches are disabled unless --cache is given, so every request takes
+the full path. Results are written as JSON; with --baseline, every benchmark
+present in both runs is compared and the script exits with status 1 if any
+got slower than --tolerance allows.
+
+    python benchmarks/bench_serving.py --output benchmarks/baseline.json
+    python benchmarks/bench_serving.py --baseline benchmarks/baseline.json
+
+benchmarks/baseline.json is the committed reference run; its "meta" block
+records the machine, library versions and settings it was taken with.
+Absolute numbers only compare on similar hardware, so regenerate it (same
+command and MODEL_BACKEND) when the reference machine changes.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.append(os.path.join(ROOT_DIR, "ml-model", "Data-Processing-Script"))
+
+DEFAULT_DATASET = os.path.join(ROOT_DIR, "ml-model", "Training-Dataset", "training_dataset_1.csv")
+
+STAND_IN_PAGE = (b"<html><head><title>stand-in</title></head><body>"
+                 b"<a href='/login' onmouseover='window.status=1'>login</a></body></html>")
+
+
+class StandInPageServer:
+    """Local HTTP server answering every GET with the same small page after `latency_ms`"""
+
+    def __init__(self, latency_ms=0.0):
+        latency = latency_ms / 1000.0
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if latency:
+                    time.sleep(latency)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(STAND_IN_PAGE)))
+                self.end_headers()
+                self.wfile.write(STAND_IN_PAGE)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def install_network_stand_ins(fe, page_server, whois_latency_ms=0.0):
+    """Point featureExtractor's page fetches at page_server and replace its WHOIS lookup"""
+    import httpx
+
+    port = page_server.port
+
+    class LocalTransport(httpx.HTTPTransport):
+        # Every URL, whatever its host, is fetched from the stand-in over loopback
+        def handle_request(self, request):
+            request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port=port)
+            return super().handle_request(request)
+
+    client = httpx.Client(transport=LocalTransport(), timeout=fe.HTTP_TIMEOUT)
+    record = SimpleNamespace(creation_date=datetime(2012, 5, 1), expiration_date=datetime(2031, 5, 1))
+
+    def stand_in_whois(netloc):
+        if whois_latency_ms:
+            time.sleep(whois_latency_ms / 1000.0)
+        return record
+
+    fe.http_client = client
+    fe.httpx = SimpleNamespace(get=client.get)
+    fe.whoisLookup = stand_in_whois
+
+
+def summarize(latencies, wall_seconds):
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "n": int(latencies_ms.size),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(latencies_ms.mean()),
+        "rps": float(latencies_ms.size / wall_seconds) if wall_seconds > 0 else None,
+    }
+
+
+def run_load(call, items, concurrency=1, warmup=10):
+    """Call `call(item)` for every item from `concurrency` threads; per-call latencies + overall rate"""
+    for item in items[:warmup]:
+        call(item)
+
+    def worker(chunk):
+        latencies = []
+        for item in chunk:
+            started = time.perf_counter()
+            call(item)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    chunks = [items[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = [latency for chunk in pool.map(worker, chunks) for latency in chunk]
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def route_call(app, path):
+    """call(url) posting to `path` with one Flask test client per thread"""
+    local = threading.local()
+
+    def call(url):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.post(path, json={"url": url})
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    return call
+
+
+def quietly(fn, *args, **kwargs):
+    """fn(*args, **kwargs) with stdout discarded (the servers and Keras print per call)"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return fn(*args, **kwargs)
+
+
+def run_suite(urls, concurrency_levels, warmup, page_latency_ms, whois_latency_ms):
+    results = {}
+    skipped = {}
+
+    def record(name, stats):
+        results[name] = stats
+        print(f"{name:<36} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  "
+              f"p99 {stats['p99_ms']:8.3f} ms  {stats['rps']:9.1f} req/s")
+
+    from preprocess_data_30_feature import extract_enhanced_features
+    record("extract_enhanced_features", run_load(extract_enhanced_features, urls, warmup=warmup))
+
+    import featureExtractor as fe
+    page_server = StandInPageServer(page_latency_ms)
+    install_network_stand_ins(fe, page_server, whois_latency_ms)
+    record("featureExtraction", run_load(fe.featureExtraction, urls, warmup=warmup))
+    record("featureExtractionConcurrent", run_load(fe.featureExtractionConcurrent, urls, warmup=warmup))
+
+    server_api = quietly(importlib.import_module, "server_api")
+    features = np.array([extract_enhanced_features(url) for url in urls], dtype=float)
+    backend = server_api.MODEL_BACKEND
+    record(f"predict_proba[{backend},1]", quietly(run_load, lambda row: server_api.predict_proba(row[None, :]),
+                                                  list(features), warmup=warmup))
+    batches = [features[i:i + 64] for i in range(0, len(features) - 63, 64)] or [features]
+    record(f"predict_proba[{backend},64]", quietly(run_load, server_api.predict_proba, batches, warmup=1))
+
+    for concurrency in concurrency_levels:
+        record(f"/predict[c={concurrency}]",
+               quietly(run_load, route_call(server_api.app, "/predict"), urls, concurrency, warmup))
+
+    try:
+        new_server_api = quietly(importlib.import_module, "new_server_api")
+    except Exception as e:
+        skipped["/prediction"] = f"new_server_api could not be loaded: {e}"
+        print(f"{'/prediction':<36} skipped ({skipped['/prediction']})")
+    else:
+        for concurrency in concurrency_levels:
+            record(f"/prediction[c={concurrency}]",
+                   quietly(run_load, route_call(new_server_api.app, "/prediction"), urls, concurrency, warmup))
+
+    page_server.close()
+    return results, skipped
+
+
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def library_versions():
+    versions = {}
+    for name in ("numpy", "pandas", "sklearn", "flask", "tensorflow", "pycaret", "lightgbm"):
+        try:
+            versions[name] = importlib.import_module(name).__version__
+        except Exception:
+            versions[name] = None
+    return versions
+
+
+def compare(results, baseline, tolerance):
+    """Benchmarks slower than the baseline by more than `tolerance` (p50, p95 or throughput)"""
+    regressions = []
+    print(f"\n{'benchmark':<36} {'p50':>8} {'p95':>8} {'rps':>8}   (ratio to baseline)")
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        p50 = stats["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        p95 = stats["p95_ms"] / base["p95_ms"] if base["p95_ms"] else 1.0
+        rps = stats["rps"] / base["rps"] if base.get("rps") else 1.0
+        slower = p50 > 1 + tolerance or p95 > 1 + tolerance or rps < 1 - tolerance
+        print(f"{name:<36} {p50:8.2f} {p95:8.2f} {rps:8.2f}   {'❌ regression' if slower else '✅'}")
+        if slower:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serving-path latency/throughput benchmarks")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--urls", type=int, default=500, help="number of URLs per benchmark")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated route concurrency levels")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--page-latency-ms", type=float, default=0.0, help="delay of the stand-in page server")
+    parser.add_argument("--whois-latency-ms", type=float, default=0.0, help="delay of the stand-in WHOIS lookup")
+    parser.add_argument("--cache", action="store_true", help="keep the servers' prediction caches enabled")
+    parser.add_argument("--output", default=None, help="write the results JSON here")
+    parser.add_argument("--baseline", default=None, help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    if not args.cache:
+        os.environ["PREDICT_CACHE"] = "0"
+        os.environ["PREDICTION_CACHE"] = "0"
+    os.environ.setdefault("WHOIS_CACHE", "0")  # the WHOIS lookup is replaced by a stand-in anyway
+
+    urls = pd.read_csv(args.dataset)["url"].sample(frac=1.0, random_state=0).tolist()[:args.urls]
+    concurrency_levels = [int(level) for level in args.concurrency.split(",") if level]
+    results, skipped = run_suite(urls, concurrency_levels, args.warmup, args.page_latency_ms, args.whois_latency_ms)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu": cpu_model(),
+            "cpu_count": os.cpu_count(),
+            "libraries": library_versions(),
+            "command": " ".join(["python", "benchmarks/bench_serving.py"] + sys.argv[1:]),
+            "model_backend": os.environ.get("MODEL_BACKEND", "keras"),
+            "urls": len(urls),
+            "concurrency": concurrency_levels,
+            "page_latency_ms": args.page_latency_ms,
+            "whois_latency_ms": args.whois_latency_ms,
+            "cache": args.cache,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} benchmark(s) slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Score a large URL list offline with the 30-feature model, no HTTP server involved.
+
+    python bulk_scan.py urls.txt --output results.jsonl
+    zcat corpus.txt.gz | python bulk_scan.py - --output results.csv --workers 16
+    python bulk_scan.py corpus.csv --column url --output results.jsonl --resume
+
+Input is one URL per line (or a CSV column with --column), from a file or
+stdin. URLs are read in batches, featurized in worker processes with the
+columnar extract_enhanced_features_batch, and scored in the main process with
+one model call per batch. At most a few batches are in flight, so memory
+does not grow with the input. Results go out in input order, flushed after
+each batch, as JSONL or CSV (picked from the output extension, or --format):
+url, probability, label, where label is "error" if the URL could not be
+parsed.
+
+Because the output is in input order, it also records progress: --resume
+drops a partially written last line, counts the finished records and skips
+that many input URLs. Line breaks and tabs inside a URL (possible in a quoted
+CSV column) are removed, as browsers do, so every record is exactly one line. Ctrl-C stops the workers and exits with status 130,
+ready for --resume.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import get_context
+
+import numpy as np
+
+from artifacts import registry  # also puts Data-Processing-Script on sys.path
+from preprocess_data_30_feature import extract_enhanced_features_batch
+
+
+URL_STRIP = str.maketrans("", "", "\t\r\n")
+
+
+def read_urls(stream, column=None):
+    """Non-empty URLs from a text stream, one per line or from a CSV column"""
+    if column is None:
+        values = stream
+    else:
+        values = (row.get(column) or "" for row in csv.DictReader(stream))
+    for value in values:
+        # completed_records() counts lines, so a URL must never span several
+        url = value.strip().translate(URL_STRIP)
+        if url:
+            yield url
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _ignore_sigint():
+    # Ctrl-C is handled once, in the main process, which then terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def featurize(urls):
+    """(N, 30) float array; rows of URLs that could not be parsed are all zeros"""
+    return extract_enhanced_features_batch(urls).to_numpy(dtype=np.float64)
+
+
+def load_predictor(backend):
+    """(N, 30) raw features -> (N,) phishing probabilities"""
+    if backend == "numpy":
+        model = registry.warmup("numpy_model")
+        return lambda features: model.predict(features)[:, 0]
+    scaler = registry.get("scaler")
+    model = registry.warmup("keras_model")
+    return lambda features: model.predict(scaler.transform(features), batch_size=len(features), verbose=0)[:, 0]
+
+
+class ResultWriter:
+    """Appends url/probability/label records as JSONL or CSV"""
+
+    def __init__(self, path, fmt, append):
+        self.fmt = fmt
+        self.file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self.csv = csv.writer(self.file) if fmt == "csv" else None
+        if self.csv is not None and self.file.tell() == 0:
+            self.csv.writerow(["url", "probability", "label"])
+
+    def write(self, urls, probabilities, failed):
+        for url, probability, bad in zip(urls, probabilities, failed):
+            if bad or np.isnan(probability):
+                probability, label = None, "error"
+            else:
+                probability = round(float(probability), 6)
+                label = "Phishing" if probability >= 0.5 else "Legitimate"
+            if self.csv is not None:
+                self.csv.writerow([url, "" if probability is None else probability, label])
+            else:
+                self.file.write(json.dumps({"url": url, "probability": probability, "label": label}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def completed_records(path, fmt):
+    """Number of complete records in a previous output; a torn last line is cut off first"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        # Cut a torn last record, so only whole lines are kept
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            cut = f.read(end - start).rfind(b"\n")
+            if cut != -1:
+                end = start + cut + 1
+                break
+            end = start
+        f.truncate(end)
+        f.seek(0)
+        lines = sum(1 for _ in f)
+    return max(0, lines - 1) if fmt == "csv" else lines
+
+
+def scan(urls, writer, make_predictor, batch_size, workers, progress_every=100000):
+    """Featurize batches on `workers` processes, score and write them in order; returns the URL count"""
+    # Workers are forked before the model is loaded, so they never inherit TensorFlow state
+    pool = get_context("fork").Pool(workers, initializer=_ignore_sigint) if workers > 1 else None
+    try:
+        predict = make_predictor()
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        raise
+    in_flight = deque()
+    done = 0
+    started = time.perf_counter()
+    next_report = progress_every
+
+    def finish(batch, features):
+        nonlocal done, next_report
+        failed = ~features.any(axis=1)
+        writer.write(batch, predict(features), failed)
+        done += len(batch)
+        if done >= next_report:
+            elapsed = time.perf_counter() - started
+            print(f"⏱️ {done} URLs in {elapsed:.1f}s ({done / elapsed:.0f} URLs/s)", file=sys.stderr)
+            next_report += progress_every
+
+    try:
+        for batch in batches(urls, batch_size):
+            if pool is None:
+                finish(batch, featurize(batch))
+                continue
+            in_flight.append((batch, pool.apply_async(featurize, (batch,))))
+            # Bounded look-ahead keeps memory constant however long the input is
+            while len(in_flight) > 2 * workers:
+                batch, result = in_flight.popleft()
+                finish(batch, result.get())
+        while in_flight:
+            batch, result = in_flight.popleft()
+            finish(batch, result.get())
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score URLs from a file or stdin with the 30-feature model")
+    parser.add_argument("input", help="URL list, one per line, or '-' for stdin")
+    parser.add_argument("--output", required=True, help="results file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="default: from --output")
+    parser.add_argument("--column", default=None, help="read this column of a CSV input instead of lines")
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="featurization processes")
+    parser.add_argument("--backend", choices=["numpy", "keras"], default=os.environ.get("MODEL_BACKEND", "numpy"))
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run into the same output")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+    skip = completed_records(args.output, fmt) if args.resume else 0
+
+    if args.input == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    else:
+        stream = open(args.input, encoding="utf-8", errors="replace", newline="")
+    urls = islice(read_urls(stream, args.column), skip, None)
+    if skip:
+        print(f"✅ Resuming after {skip} already scored URLs", file=sys.stderr)
+
+    writer = ResultWriter(args.output, fmt, append=args.resume)
+    started = time.perf_counter()
+    try:
+        total = scan(urls, writer, lambda: load_predictor(args.backend), args.batch_size, max(1, args.workers))
+    except KeyboardInterrupt:
+        print(f"⚠️ Interrupted; rerun with --resume to continue into {args.output}", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        writer.close()
+        stream.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scored {total} URLs in {elapsed:.1f}s -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
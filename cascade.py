@@ -0,0 +1,108 @@
+"""Two-stage URL classifier: lexical MLP first, network features only when it is unsure.
+
+Stage 1 is server_api's 30-feature lexical model (no network I/O). Only when
+its phishing probability falls inside [low, high] (or is NaN) does the URL go
+to stage 2: new_server_api's WHOIS + page-fetch features and the PyCaret
+pipeline, which cost seconds of network time per URL.
+"""
+import threading
+from contextlib import nullcontext
+
+import numpy as np
+
+LEXICAL = "lexical"
+NETWORK = "network"
+
+# Class labels of new_server_api's model that mean "phishing", however the target was encoded
+POSITIVE_LABELS = (1, "1", "phishing")
+
+
+class CascadeConfigError(ValueError):
+    """The cascade was asked for but cannot be set up; raised at startup rather than disabling it"""
+
+
+def positive_class_index(labels):
+    """Column of predict_proba holding the phishing probability, given the (decoded) class labels"""
+    labels = list(labels)
+    matches = [i for i, label in enumerate(labels)
+               if (label.strip().lower() if isinstance(label, str) else label) in POSITIVE_LABELS]
+    if len(matches) != 1:
+        raise CascadeConfigError(
+            f"Cannot tell the phishing class among the network model's classes {labels!r}; "
+            f"expected exactly one of {POSITIVE_LABELS!r}")
+    return matches[0]
+
+
+def network_stage(registry, metrics=None):
+    """Phishing probability for a URL from new_server_api's features and model (compiled when possible)"""
+    from featureExtractor import FEATURE_NAMES, featureExtractionConcurrent, featureValuesConcurrent
+
+    try:
+        compiled = registry.warmup("phishingdetection_compiled")
+    except ValueError as e:
+        print("❌ Compiled fast path unavailable for the cascade, using model.predict_proba:", e)
+        compiled = None
+    pipeline = registry.get("phishingdetection")
+    registry.warmup("pca")
+    if compiled is not None:
+        labels = compiled.class_labels
+    else:
+        # pipeline.classes_ are the estimator's (possibly label-encoded) classes; decode them like predict does
+        labels = pipeline.classes_
+        if hasattr(pipeline, "inverse_transform"):
+            labels = pipeline.inverse_transform(labels)
+    positive = positive_class_index(labels)
+
+    def stage(name):
+        return metrics.stage(name) if metrics is not None else nullcontext()
+
+    def predict(url):
+        if compiled is not None:
+            with stage("network_extraction"):
+                features = featureValuesConcurrent(url)
+            with stage("network_inference"):
+                return float(compiled.predict_proba(np.array([features], dtype=float))[0, positive])
+        with stage("network_extraction"):
+            row = featureExtractionConcurrent(url)
+        with stage("network_inference"):
+            return float(pipeline.predict_proba(row[FEATURE_NAMES])[0, positive])
+
+    return predict
+
+
+class CascadeClassifier:
+    """Routes each URL to the lexical model or, inside the uncertainty band, to the network model"""
+
+    def __init__(self, lexical_proba, network_proba, low=0.2, high=0.8):
+        if not 0.0 <= low <= high <= 1.0:
+            raise CascadeConfigError(f"Invalid cascade band: [{low}, {high}]")
+        self.lexical_proba = lexical_proba
+        self.network_proba = network_proba
+        self.low = low
+        self.high = high
+        self._lock = threading.Lock()
+        self.decisions = {LEXICAL: 0, NETWORK: 0}
+
+    def is_uncertain(self, probability):
+        # NaN fails both comparisons, so it is escalated too
+        return not (probability < self.low or probability > self.high)
+
+    def classify(self, url, features):
+        """(phishing probability, deciding stage, stage-1 probability) for one URL and its 30 lexical features"""
+        lexical = float(self.lexical_proba(np.array([features], dtype=float))[0])
+        if self.is_uncertain(lexical):
+            probability, stage = self.network_proba(url), NETWORK
+        else:
+            probability, stage = lexical, LEXICAL
+        with self._lock:
+            self.decisions[stage] += 1
+        return probability, stage, lexical
+
+    def stats(self):
+        with self._lock:
+            total = sum(self.decisions.values())
+            return {
+                "band": [self.low, self.high],
+                "decisions": dict(self.decisions),
+                "escalation_rate": self.decisions[NETWORK] / total if total else 0.0,
+            }
@@ -0,0 +1,212 @@
+"""pandas-free inference for the PyCaret pipeline served by new_server_api.py.
+
+The Pipeline returned by pycaret's load_model wraps every step in a
+TransformerWrapper that converts to and from DataFrames, which costs far more
+than the model itself for a 10-feature row. CompiledPipeline copies the fitted
+parameters out of each step and replays them on NumPy arrays:
+
+    SimpleImputer       NaN -> fitted statistic, on the step's columns
+    PowerTransformer    Yeo-Johnson with the fitted lambdas (+ its own standardization)
+    StandardScaler      (x - mean) / scale
+    CleanColumnNames    nothing (it only renames columns)
+    LabelEncoder        nothing for X; predict() decodes labels with it, as
+                        pipeline.predict does (target given as e.g. strings)
+
+The final estimator then scores the array directly; a LightGBM model is called
+through its Booster. Any other step raises ValueError, so callers can keep
+using pipeline.predict.
+
+`classes` are the estimator's classes (= pipeline.classes_, the column order
+of predict_proba); `class_labels` are the same classes decoded to the target's
+original values, which is what predict() returns.
+"""
+import sys
+
+import numpy as np
+
+EPS = np.spacing(1.0)
+
+# Steps that only touch column names
+NO_OP_STEPS = {"CleanColumnNames"}
+
+# Target-only step; pipeline.predict applies its inverse_transform to the labels
+LABEL_ENCODER_STEP = "LabelEncoder"
+
+
+def _yeo_johnson(x, lmbda):
+    """sklearn's PowerTransformer._yeo_johnson_transform for one column"""
+    out = np.zeros_like(x)
+    pos = x >= 0
+    if abs(lmbda) < EPS:
+        out[pos] = np.log1p(x[pos])
+    else:
+        out[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+    if abs(lmbda - 2) > EPS:
+        out[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+    else:
+        out[~pos] = -np.log1p(-x[~pos])
+    return out
+
+
+def _scaler_step(scaler, columns):
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(len(columns))
+    scale = scaler.scale_ if scaler.with_std else np.ones(len(columns))
+
+    def apply(X):
+        X[:, columns] = (X[:, columns] - mean) / scale
+    return apply
+
+
+def _compile_step(transformer, columns):
+    """In-place function on an (N, n_features) float array reproducing transformer.transform"""
+    kind = type(transformer).__name__
+
+    if kind == "SimpleImputer":
+        if transformer.add_indicator:
+            raise ValueError("SimpleImputer with add_indicator is not supported")
+        statistics = np.asarray(transformer.statistics_, dtype=np.float64)
+
+        def apply(X):
+            block = X[:, columns]
+            missing = np.isnan(block)
+            if missing.any():
+                X[:, columns] = np.where(missing, statistics, block)
+        return apply
+
+    if kind == "PowerTransformer":
+        if transformer.method != "yeo-johnson":
+            raise ValueError(f"PowerTransformer method {transformer.method!r} is not supported")
+        lambdas = [float(l) for l in transformer.lambdas_]
+        standardize = _scaler_step(transformer._scaler, columns) if transformer.standardize else None
+
+        def apply(X):
+            with np.errstate(invalid="ignore"):
+                for column, lmbda in zip(columns, lambdas):
+                    X[:, column] = _yeo_johnson(X[:, column], lmbda)
+            if standardize is not None:
+                standardize(X)
+        return apply
+
+    if kind == "StandardScaler":
+        return _scaler_step(transformer, columns)
+
+    raise ValueError(f"Unsupported pipeline step: {kind}")
+
+
+class CompiledPipeline:
+    """Fitted PyCaret pipeline replayed on NumPy arrays whose columns follow `feature_names`"""
+
+    def __init__(self, steps, estimator, feature_names, label_encoder=None):
+        self.steps = steps
+        self.estimator = estimator
+        self.feature_names = list(feature_names)
+        self.classes = np.asarray(estimator.classes_)
+        self.class_labels = (self.classes if label_encoder is None
+                             else np.asarray(label_encoder.inverse_transform(self.classes)))
+        # LightGBM's Booster scores a float64 array without the sklearn wrapper's checks
+        booster = getattr(estimator, "booster_", None)
+        self.booster = booster if booster is not None and len(self.classes) == 2 else None
+
+    @classmethod
+    def from_pipeline(cls, pipeline, feature_names):
+        """Compile a loaded pipeline; raises ValueError if any step cannot be replayed"""
+        index = {name: i for i, name in enumerate(feature_names)}
+        steps = []
+        label_encoder = None
+        for name, step in pipeline.steps[:-1]:
+            transformer = getattr(step, "transformer", step)
+            if getattr(step, "_train_only", False) or type(transformer).__name__ in NO_OP_STEPS:
+                continue  # skipped by pipeline.predict too
+            if type(transformer).__name__ == LABEL_ENCODER_STEP:
+                label_encoder = transformer
+                continue
+            include = getattr(step, "_include", None)
+            include = list(feature_names) if include is None else list(include)
+            if not include:
+                continue
+            try:
+                columns = [index[column] for column in include]
+            except KeyError as e:
+                raise ValueError(f"Step {name!r} uses unknown column {e}") from None
+            steps.append(_compile_step(transformer, np.asarray(columns)))
+
+        estimator = pipeline.steps[-1][1]
+        if not hasattr(estimator, "predict_proba"):
+            raise ValueError(f"Final estimator {type(estimator).__name__} has no predict_proba")
+        return cls(steps, estimator, feature_names, label_encoder)
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64, ndmin=2)  # copy: the steps work in place
+        for apply in self.steps:
+            apply(X)
+        return X
+
+    def predict_proba(self, X):
+        """(N, n_classes) class probabilities, like pipeline.predict_proba"""
+        X = self.transform(X)
+        if self.booster is not None:
+            positive = self.booster.predict(X)
+            return np.column_stack([1.0 - positive, positive])
+        return self.estimator.predict_proba(X)
+
+    def predict(self, X):
+        """(N,) class labels in the target's original values, like pipeline.predict"""
+        return self.class_labels[np.argmax(self.predict_proba(X), axis=1)]
+
+
+if __name__ == "__main__":
+    # Parity check against pipeline.predict / predict_proba on feature rows of the training URLs:
+    #   python compiled_pipeline.py [training.csv]
+    # The WHOIS- and page-derived columns are cycled through all their values (no network
+    # needed) and some rows get NaN in the imputed columns.
+    import itertools
+    import time
+    import pandas as pd
+    from artifacts import registry  # also puts Data-Processing-Script on sys.path
+    from featureExtractor import FEATURE_NAMES, buildFeatureValues, projectDom
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "ml-model/Training-Dataset/training_dataset_1.csv"
+    urls = pd.read_csv(data_path)["url"].astype(str).tolist()
+
+    combos = list(itertools.product([0, 1], [0, 1], itertools.product([0, 1], repeat=3)))
+    rows = []
+    for i, url in enumerate(urls):
+        row = buildFeatureValues(url, 1, "", "")
+        domain_age, domain_end, dom = combos[i % len(combos)]
+        row[FEATURE_NAMES.index("Domain_Age")] = domain_age
+        row[FEATURE_NAMES.index("Domain_End")] = domain_end
+        row[FEATURE_NAMES.index("domain_att")] = projectDom(dom)
+        if i % 97 == 0:
+            row[FEATURE_NAMES.index("URL_Depth")] = np.nan
+        rows.append(row)
+    X = np.array(rows, dtype=np.float64)
+    frame = pd.DataFrame(X, columns=FEATURE_NAMES)
+
+    pipeline = registry.get("phishingdetection")
+    compiled = CompiledPipeline.from_pipeline(pipeline, FEATURE_NAMES)
+
+    reference_labels = np.asarray(pipeline.predict(frame))
+    reference_proba = np.asarray(pipeline.predict_proba(frame))
+    labels = compiled.predict(X)
+    proba = compiled.predict_proba(X)
+    label_mismatches = int(np.sum(labels != reference_labels))
+    max_abs_diff = float(np.max(np.abs(proba - reference_proba)))
+    print(f"Rows: {len(X)}  max |pipeline - compiled| probability: {max_abs_diff:.3e}  "
+          f"label mismatches: {label_mismatches}")
+
+    sample = list(range(min(200, len(X))))
+    started = time.perf_counter()
+    for i in sample:
+        pipeline.predict(frame.iloc[[i]])
+    pipeline_ms = (time.perf_counter() - started) * 1000 / len(sample)
+    started = time.perf_counter()
+    for i in sample:
+        compiled.predict(X[i:i + 1])
+    compiled_ms = (time.perf_counter() - started) * 1000 / len(sample)
+    print(f"Single row: pipeline.predict {pipeline_ms:.3f} ms, compiled {compiled_ms:.3f} ms "
+          f"({pipeline_ms / compiled_ms:.1f}x)")
+
+    if max_abs_diff > 1e-9 or label_mismatches:
+        print("❌ Compiled pipeline does not match pipeline.predict")
+        sys.exit(1)
+    print("✅ Compiled pipeline matches pipeline.predict")
@@ -3,6 +3,8 @@ from urllib.parse import urlparse, urlencode, unquote
 import re
 # importing required packages for Domain Based Feature Extraction
 from datetime import datetime
+import os
+from patternMatcher import AhoCorasick, loadPatterns
 
 
 # 2.Checks for IP address in URL (Have_IP)
@@ -44,10 +46,17 @@ shortening_services = r"bit\.ly|goo\.gl|shorte\.st|go2l\.ink|x\.co|ow\.ly|t\.co|
                       r"prettylinkpro\.com|scrnch\.me|filoops\.info|vzturl\.com|qr\.net|1url\.com|tweez\.me|v\.gd|" \
                       r"tr\.im|link\.zip\.net"
 
+# the same services as plain literals, plus any extra ones listed in SHORTENING_SERVICES_FILE
+shorteningServices = [service.replace('\\.', '.') for service in shortening_services.split('|')]
+if os.environ.get('SHORTENING_SERVICES_FILE'):
+  shorteningServices += loadPatterns(os.environ['SHORTENING_SERVICES_FILE'])
+
+# compiled once at import; matching cost does not grow with the number of services
+shorteningMatcher = AhoCorasick(shorteningServices)
+
 # 8. Checking for Shortening Services in URL (Tiny_URL)
 def tinyURL(url):
-    match=re.search(shortening_services,url)
-    if match:
+    if shorteningMatcher.search(url):
         return 1
     else:
         return 0
@@ -70,11 +79,16 @@ sensitiveWords = ["account", "confirm", "banking", "secure", "ebyisapi", "webscr
                   "myaccount", "updateinfo", "loginsecure", "protect", "transaction", "identity", "member"
                   "personal", "actionrequired", "loginverify", "validate", "paymentupdate", "urgent"]
 
+# extra brand / keyword list, one word per line
+if os.environ.get('SENSITIVE_WORDS_FILE'):
+  sensitiveWords = sensitiveWords + loadPatterns(os.environ['SENSITIVE_WORDS_FILE'])
+
+sensitiveMatcher = AhoCorasick(sensitiveWords)
+
 def sensitive_word(url):
   domain = urlparse(url).netloc
-  for i in sensitiveWords:
-    if i in domain:
-      return 1
+  if sensitiveMatcher.search(domain):
+    return 1
   return 0
 
 
@@ -1,13 +1,145 @@
+import os
+import time
 import whois
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 import httpx
 import pickle as pk
 import pandas as pd
 import extractorFunctions as ef
+import whoisCache
+
+# Fitted PCA over the iFrame / Web_Forwards / Mouse_Over features, resolved relative to this file
+PCA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model', 'pca_model.pkl')
+
+# Columns of the row returned by featureExtraction, in model input order
+FEATURE_NAMES = ['URL_Length', 'URL_Depth', 'TinyURL', 'Prefix/Suffix', 'No_Of_Dots', 'Sensitive_Words',
+                 'Domain_Age', 'Domain_End', 'Have_Symbol', 'domain_att']
+
+# Per-lookup deadlines (seconds) used by featureExtractionConcurrent
+WHOIS_TIMEOUT = float(os.environ.get('WHOIS_TIMEOUT', 5))
+HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', 5))
+
+# Shared keep-alive connection pool for page fetches. Same request semantics as httpx.get
+# (no redirect following); cookies are never stored so requests stay independent.
+http_client = httpx.Client(
+  timeout=HTTP_TIMEOUT,
+  limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+  cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+)
+
+# Persistent WHOIS cache shared by all workers (WHOIS_CACHE=0 disables it)
+whois_cache = whoisCache.cacheFromEnv()
+
+# Worker threads for the whois and page lookups; a lookup that overruns its deadline keeps
+# its thread until it returns, so size this above the expected number of concurrent requests x 2
+lookup_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('LOOKUP_POOL_SIZE', 32)),
+                                 thread_name_prefix='feature-lookup')
+
+# Optional callback(stage, seconds, failed) told the duration of every whois lookup ('whois')
+# and page fetch ('http_fetch'); the servers point it at their metrics
+stageObserver = None
+
+_pca = None
+_pcaProjection = None
+
+#Unpickle the PCA model once per process
+def loadPCA():
+  global _pca
+  if _pca is None:
+    with open(PCA_PATH, 'rb') as file:
+      _pca = pk.load(file)
+  return _pca
+
+#First PCA component of the [iFrame, Web_Forwards, Mouse_Over] values, same as
+#pca.transform but on plain floats (no DataFrame per call)
+def projectDom(dom):
+  global _pcaProjection
+  if _pcaProjection is None:
+    pca = loadPCA()
+    scale = float(pca.explained_variance_[0]) ** 0.5 if pca.whiten else 1.0
+    _pcaProjection = ([float(m) for m in pca.mean_], [float(c) / scale for c in pca.components_[0]])
+  mean, component = _pcaProjection
+  return sum((value - m) * c for value, m, c in zip(dom, mean, component))
+
+#WHOIS record for a netloc, served from whois_cache when enabled. The socket timeout frees the
+#lookup_pool thread from a slow registrar; the future's deadline alone only stops the wait
+def whoisLookup(netloc):
+  if whois_cache is None:
+    return whois.whois(netloc, timeout=WHOIS_TIMEOUT)
+  return whois_cache.lookup(netloc, timeout=WHOIS_TIMEOUT)
+
+#Run one lookup and report its duration (and whether it raised) to stageObserver
+def timedLookup(stage, lookup, *args, **kwargs):
+  started = time.perf_counter()
+  failed = True
+  try:
+    result = lookup(*args, **kwargs)
+    failed = False
+    return result
+  finally:
+    if stageObserver is not None:
+      stageObserver(stage, time.perf_counter() - started, failed)
 
 #Function to extract features
 def featureExtraction(url):
 
+  domain_name = ''
+  dns = 0
+  try:
+    domain_name = timedLookup('whois', whoisLookup, urlparse(url).netloc)
+  except:
+    dns = 1
+
+  try:
+    response = timedLookup('http_fetch', httpx.get, url)
+  except:
+    response = ""
+
+  return buildFeatureRow(url, dns, domain_name, response)
+
+#Same feature row as featureExtraction, but the whois lookup and the page fetch run at the
+#same time on lookup_pool, the fetch reuses http_client, and each lookup has its own deadline
+def featureExtractionConcurrent(url, whois_timeout=None, http_timeout=None):
+  return buildFeatureRow(url, *concurrentLookups(url, whois_timeout, http_timeout))
+
+#Values of the featureExtractionConcurrent row as a plain list, in FEATURE_NAMES order
+def featureValuesConcurrent(url, whois_timeout=None, http_timeout=None):
+  return buildFeatureValues(url, *concurrentLookups(url, whois_timeout, http_timeout))
+
+#(dns, domain_name, response) from the concurrent whois lookup and page fetch
+def concurrentLookups(url, whois_timeout=None, http_timeout=None):
+  whois_timeout = WHOIS_TIMEOUT if whois_timeout is None else whois_timeout
+  http_timeout = HTTP_TIMEOUT if http_timeout is None else http_timeout
+
+  started = time.monotonic()
+  whois_future = lookup_pool.submit(timedLookup, 'whois', whoisLookup, urlparse(url).netloc)
+  page_future = lookup_pool.submit(timedLookup, 'http_fetch', http_client.get, url, timeout=http_timeout)
+
+  domain_name = ''
+  dns = 0
+  try:
+    domain_name = whois_future.result(timeout=max(0.0, started + whois_timeout - time.monotonic()))
+  except Exception:
+    whois_future.cancel()
+    dns = 1
+
+  try:
+    response = page_future.result(timeout=max(0.0, started + http_timeout - time.monotonic()))
+  except Exception:
+    page_future.cancel()
+    response = ""
+
+  return dns, domain_name, response
+
+#Assemble the model input row (one-row DataFrame) from the URL and the whois / page lookup results
+def buildFeatureRow(url, dns, domain_name, response):
+  return pd.DataFrame([buildFeatureValues(url, dns, domain_name, response)], columns=FEATURE_NAMES)
+
+#Model input values, in FEATURE_NAMES order, from the URL and the whois / page lookup results
+def buildFeatureValues(url, dns, domain_name, response):
+
   features = []
   #Address bar based features (12)
   features.append(ef.getLength(url))
@@ -17,40 +149,18 @@ def featureExtraction(url):
   features.append(ef.no_of_dots(url))
   features.append(ef.sensitive_word(url))
 
-
-  domain_name = ''
   #Domain based features (4)
-  dns = 0
-  try:
-    domain_name = whois.whois(urlparse(url).netloc)
-  except:
-    dns = 1
-
   features.append(1 if dns == 1 else ef.domainAge(domain_name))
   features.append(1 if dns == 1 else ef.domainEnd(domain_name))
 
   # HTML & Javascript based features (4)
   dom = []
-  try:
-    response = httpx.get(url)
-  except:
-    response = ""
-
   dom.append(ef.iframe(response))
   dom.append(ef.mouseOver(response))
   dom.append(ef.forwarding(response))
 
   features.append(ef.has_unicode(url)+ef.haveAtSign(url)+ef.havingIP(url))
 
-  with open('ml-model/Data-Processing-Script/model/pca_model.pkl', 'rb') as file:
-    pca = pk.load(file)
-
-  #converting the list to dataframe
-  feature_names = ['URL_Length', 'URL_Depth', 'TinyURL', 'Prefix/Suffix', 'No_Of_Dots', 'Sensitive_Words',
-                       'Domain_Age', 'Domain_End', 'Have_Symbol','domain_att']
-  dom_pd = pd.DataFrame([dom], columns = ['iFrame','Web_Forwards','Mouse_Over'])
-  features.append(pca.transform(dom_pd)[0][0])
-
-  row = pd.DataFrame([features], columns= feature_names)
+  features.append(projectDom(dom))
 
-  return row
\ No newline at end of file
+  return features
\ No newline at end of file
@@ -0,0 +1,61 @@
+from collections import deque
+
+
+class AhoCorasick:
+  """Literal multi-pattern substring matcher (Aho-Corasick automaton).
+
+  Built once; search() walks the text a single time, so its cost depends on
+  the text length and not on how many patterns were loaded.
+  """
+
+  def __init__(self, patterns):
+    self.patterns = [p for p in dict.fromkeys(patterns) if p]
+    self._goto = [{}]
+    self._fail = [0]
+    self._match = [False]
+
+    for pattern in self.patterns:
+      state = 0
+      for c in pattern:
+        nxt = self._goto[state].get(c)
+        if nxt is None:
+          nxt = len(self._goto)
+          self._goto[state][c] = nxt
+          self._goto.append({})
+          self._fail.append(0)
+          self._match.append(False)
+        state = nxt
+      self._match[state] = True
+
+    # Failure links in breadth-first order, so a state's fallback is always resolved first
+    queue = deque(self._goto[0].values())
+    while queue:
+      state = queue.popleft()
+      for c, nxt in self._goto[state].items():
+        queue.append(nxt)
+        fallback = self._fail[state]
+        while fallback and c not in self._goto[fallback]:
+          fallback = self._fail[fallback]
+        self._fail[nxt] = self._goto[fallback].get(c, 0)
+        self._match[nxt] = self._match[nxt] or self._match[self._fail[nxt]]
+
+  def search(self, text):
+    """True if any pattern occurs in text"""
+    goto, fail, match = self._goto, self._fail, self._match
+    state = 0
+    for c in text:
+      while state and c not in goto[state]:
+        state = fail[state]
+      state = goto[state].get(c, 0)
+      if match[state]:
+        return True
+    return False
+
+  def __len__(self):
+    return len(self.patterns)
+
+
+def loadPatterns(path):
+  """One pattern per line; blank lines and lines starting with '#' are skipped"""
+  with open(path, encoding='utf-8') as file:
+    return [line.strip() for line in file if line.strip() and not line.lstrip().startswith('#')]
@@ -3,6 +3,7 @@ import numpy as np
 from urllib.parse import urlparse
 from sklearn.preprocessing import LabelEncoder
 import re
+from preprocess_data_30_feature import UrlColumns, DIGIT_TABLE
 
 def extract_url_features(url):
     """Extract features from URL string"""
@@ -48,6 +49,38 @@ def extract_url_features(url):
                               'num_slashes', 'num_digits', 'num_parameters',
                               'has_https', 'has_port', 'has_fragment']}
 
+URL_FEATURE_NAMES = ['length_url', 'length_hostname', 'length_path',
+                     'num_dots', 'num_hyphens', 'num_underscores',
+                     'num_slashes', 'num_digits', 'num_parameters',
+                     'has_https', 'has_port', 'has_fragment']
+
+def extract_url_features_batch(urls):
+    """Columnar extract_url_features for a whole URL column.
+
+    Returns an int DataFrame with URL_FEATURE_NAMES columns, indexed like `urls`,
+    whose rows equal extract_url_features(url).
+    """
+    cols = UrlColumns(urls)
+    whole = (cols.starts, cols.ends)
+    length_query = cols.length(cols.query)
+
+    columns = [
+        cols.lengths, cols.length(cols.netloc), cols.length(cols.path),
+        cols.count('.', *whole), cols.count('-', *whole), cols.count('_', *whole),
+        cols.count('/', *whole), cols.count(DIGIT_TABLE, *whole),
+        np.where(length_query > 0, cols.count('&', *cols.query) + 1, 0),
+        cols.equals(cols.scheme, 'https', lower=True), cols.port != 0, cols.length(cols.fragment) > 0,
+    ]
+    features = np.column_stack([np.asarray(c, dtype=np.int64) for c in columns])
+
+    # urlparse(...).port raises on these, so extract_url_features returns its zero fallback
+    features[cols.bad_port] = 0
+    for i in np.flatnonzero(cols.fallback):
+        row = extract_url_features(cols.urls.iat[i])
+        features[i] = [row[name] for name in URL_FEATURE_NAMES]
+
+    return pd.DataFrame(features, columns=URL_FEATURE_NAMES, index=cols.urls.index)
+
 def preprocess_dataset(input_file, output_file):
     """Preprocess the phishing dataset and save to new CSV"""
     print("Loading dataset...")
@@ -81,9 +114,7 @@ def preprocess_dataset(input_file, output_file):
     
     print("Extracting features from URLs...")
     # Extract features from URLs
-    url_features = pd.DataFrame([
-        extract_url_features(url) for url in df[url_column]
-    ])
+    url_features = extract_url_features_batch(df[url_column])
     
     # Drop the original URL column and combine with any existing numeric features
     numeric_columns = df.select_dtypes(include=[np.number]).columns
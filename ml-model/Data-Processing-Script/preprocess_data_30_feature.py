@@ -2,8 +2,82 @@ import pandas as pd
 import numpy as np
 from urllib.parse import urlparse
 import re
+import os
+import argparse
+import operator
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+FEATURE_NAMES = [
+    'length_url', 'length_hostname', 'length_path', 'length_query', 'length_fragment',
+    'num_dots', 'num_hyphens', 'num_underscores', 'num_slashes', 'num_equals',
+    'num_at', 'num_and', 'num_exclamation', 'num_space', 'num_tilde',
+    'has_https', 'has_port', 'has_fragment', 'has_query', 'has_digits',
+    'num_digits', 'num_letters', 'num_parameters', 'num_fragments', 'num_subdirectories',
+    'digits_ratio', 'letters_ratio', 'special_chars_ratio', 'directory_length_mean',
+    'suspicious_tld'
+]
+
+SUSPICIOUS_TLDS = frozenset(['xyz', 'info', 'online', 'site', 'work'])
+
+# Label values treated as the positive (phishing) class in the binary output
+PHISHING_LABELS = [1, '1', 'phishing']
+
 
 def extract_enhanced_features(url):
+    """30 lexical URL features in FEATURE_NAMES order.
+
+    All character counts come from one Counter pass over the URL (digits and
+    letters are classified per distinct character), and the path is split
+    once. Output is identical to extract_enhanced_features_reference.
+    """
+    try:
+        parsed = urlparse(url)
+        netloc = parsed.netloc
+        path = parsed.path
+        query = parsed.query
+        fragment = parsed.fragment
+
+        length_url = len(url)
+        char_counts = Counter(url)
+        num_digits = 0
+        num_letters = 0
+        for c, n in char_counts.items():
+            if c.isdigit():
+                num_digits += n
+            if c.isalpha():
+                num_letters += n
+
+        directory_lengths = [len(x) for x in path.split('/') if x]
+        num_subdirectories = len(directory_lengths)
+
+        if length_url > 0:
+            digits_ratio = num_digits / length_url
+            letters_ratio = num_letters / length_url
+            special_chars_ratio = (length_url - num_letters - num_digits) / length_url
+        else:
+            digits_ratio = letters_ratio = special_chars_ratio = 0
+
+        return [
+            float(length_url), float(len(netloc)), float(len(path)), float(len(query)), float(len(fragment)),
+            float(char_counts['.']), float(char_counts['-']), float(char_counts['_']), float(char_counts['/']),
+            float(char_counts['=']), float(char_counts['@']), float(char_counts['&']), float(char_counts['!']),
+            float(char_counts[' ']), float(char_counts['~']),
+            float(parsed.scheme == 'https'), float(bool(parsed.port)), float(bool(fragment)), float(bool(query)),
+            float(num_digits > 0),
+            float(num_digits), float(num_letters),
+            float(len(query.split('&')) if query else 0),
+            float(len(fragment.split('#')) if fragment else 0),
+            float(num_subdirectories),
+            float(digits_ratio), float(letters_ratio), float(special_chars_ratio),
+            sum(directory_lengths) / num_subdirectories if num_subdirectories else 0.0,
+            float(netloc.split('.')[-1] in SUSPICIOUS_TLDS),
+        ]
+    except:
+        return {k: 0 for k in FEATURE_NAMES}
+
+def extract_enhanced_features_reference(url):
+    """Original multi-pass extractor; kept as the parity/benchmark reference for extract_enhanced_features"""
     try:
         parsed = urlparse(url)
 
@@ -66,48 +140,387 @@ def extract_enhanced_features(url):
             'suspicious_tld'
         ]}
 
-def preprocess_dataset(input_file, output_file):
-    """Preprocess the phishing dataset with enhanced features"""
+def _byte_table(chars):
+    table = np.zeros(256, dtype=bool)
+    table[list(chars.encode('ascii'))] = True
+    return table
+
+
+DIGIT_TABLE = _byte_table('0123456789')
+ALPHA_TABLE = _byte_table('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+SCHEME_TABLE = _byte_table('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+-.')
+LOWER_TABLE = np.arange(256, dtype=np.uint8)
+LOWER_TABLE[ord('A'):ord('Z') + 1] += 32
+
+
+class UrlColumns:
+    """Vectorized urlparse over a column of URLs.
+
+    All URLs are concatenated into one ASCII byte buffer and each row is a
+    [start, end) slice of it. For every character class the sorted positions
+    of its matches are computed once; per-row counts over any slice, and the
+    next/previous occurrence used to find the netloc/path/query/fragment
+    boundaries (following urlsplit's rules), are then `searchsorted` lookups.
+
+    Rows the byte-level split cannot reproduce exactly (non-strings, non-ASCII,
+    leading control/space characters, tab/CR/LF, IPv6 brackets, ';' params) are
+    flagged in `fallback` and must go through the per-URL extractor; rows where
+    urlparse(...).port would raise are flagged in `bad_port`.
+    """
+
+    def __init__(self, urls):
+        self.urls = pd.Series(urls)
+        values = self.urls.tolist()
+        clean = [u if isinstance(u, str) and u.isascii() else '' for u in values]
+        usable = np.fromiter(map(operator.is_, clean, values), dtype=bool, count=len(values))
+        self.lengths = np.fromiter(map(len, clean), dtype=np.int64, count=len(values))
+        self.ends = np.cumsum(self.lengths)
+        self.starts = self.ends - self.lengths
+        self.text = ''.join(clean)
+        # Zero padding so per-row reads a few bytes past the last row stay in bounds
+        self.buf = np.frombuffer(self.text.encode('ascii') + b'\0' * 8, dtype=np.uint8)
+        self._positions = {}
+
+        starts, ends = self.starts, self.ends
+        n = len(values)
+
+        # scheme: everything before the first ':' if it is alpha + scheme chars
+        colon = np.minimum(self.next(':', starts), ends)
+        scheme_ok = ((colon > starts) & (colon < ends) & ALPHA_TABLE[self.buf[starts]]
+                     & (self.count(~SCHEME_TABLE, starts, colon) == 0))
+        rest = np.where(scheme_ok, colon + 1, starts)
+        self.scheme = (starts, np.where(scheme_ok, colon, starts))
+
+        # //netloc up to the first '/', '?' or '#'
+        has_netloc = (ends - rest >= 2) & (self.buf[rest] == ord('/')) & (self.buf[rest + 1] == ord('/'))
+        netloc_start = np.where(has_netloc, rest + 2, rest)
+        netloc_end = np.where(has_netloc, np.minimum(self.next(_byte_table('/?#'), netloc_start), ends), rest)
+        self.netloc = (netloc_start, netloc_end)
+
+        # #fragment is split off before ?query
+        hash_pos = np.minimum(self.next('#', netloc_end), ends)
+        question = np.minimum(self.next('?', netloc_end), hash_pos)
+        self.path = (netloc_end, question)
+        self.query = (np.where(question < hash_pos, question + 1, hash_pos), hash_pos)
+        self.fragment = (np.where(hash_pos < ends, hash_pos + 1, ends), ends)
+
+        # port: after the first ':' of the netloc's host part (after the last '@')
+        netloc_last = netloc_end - 1
+        last_at = self.prev('@', netloc_last)
+        host_start = np.where(last_at >= netloc_start, last_at + 1, netloc_start)
+        port_start = np.minimum(self.next(':', host_start) + 1, netloc_end)
+        has_port_text = netloc_end > port_start
+        all_digits = self.count(~DIGIT_TABLE, port_start, netloc_end) == 0
+        self.port = np.zeros(n, dtype=np.int64)
+        for i in np.flatnonzero(has_port_text & all_digits):
+            self.port[i] = int(self.text[port_start[i]:netloc_end[i]])
+        self.bad_port = has_port_text & (~all_digits | (self.port > 65535))
+        self.port[self.bad_port] = 0
+
+        # last '.'-separated label of the netloc
+        last_dot = self.prev('.', netloc_last)
+        self.tld = (np.where(last_dot >= netloc_start, last_dot + 1, netloc_start), netloc_end)
+
+        self.fallback = (~usable
+                         | ((self.lengths > 0) & (self.buf[starts] <= 0x20))
+                         | (self.count(_byte_table('\t\r\n'), starts, ends) > 0)
+                         | (self.count(_byte_table('[]'), *self.netloc) > 0)
+                         | (self.count(';', *self.path) > 0))
+
+    def positions(self, chars):
+        """Sorted buffer offsets of bytes matching `chars` (one character or a byte table), cached"""
+        key = chars if isinstance(chars, str) else chars.tobytes()
+        found = self._positions.get(key)
+        if found is None:
+            mask = self.buf == ord(chars) if isinstance(chars, str) else chars[self.buf]
+            found = np.flatnonzero(mask[:len(self.text)])
+            self._positions[key] = found
+        return found
+
+    def count(self, chars, start, end):
+        """Per-row number of bytes matching `chars` in [start, end)"""
+        found = self.positions(chars)
+        return np.searchsorted(found, end) - np.searchsorted(found, start)
+
+    def next(self, chars, at):
+        """Per-row offset of the first match at or after `at` (len(buffer) if none)"""
+        found = np.append(self.positions(chars), len(self.buf))
+        return found[np.searchsorted(found, at)]
+
+    def prev(self, chars, at):
+        """Per-row offset of the last match at or before `at` (-1 if none)"""
+        found = np.insert(self.positions(chars), 0, -1)
+        return found[np.searchsorted(found, at, side='right') - 1]
+
+    def length(self, part):
+        start, end = part
+        return end - start
+
+    def equals(self, part, word, lower=False):
+        """Per-row test that the slice `part` is exactly `word`"""
+        start, end = part
+        match = (end - start) == len(word)
+        for k, byte in enumerate(word.encode('ascii')):
+            values = self.buf[np.minimum(start + k, len(self.buf) - 1)]  # clamp past-the-row reads
+            match &= (LOWER_TABLE[values] if lower else values) == byte
+        return match
+
+    def segments(self, part, separator):
+        """Per-row number of non-empty `separator`-delimited segments in `part`"""
+        start, end = part
+        # Each segment ends either at a separator directly after a non-separator, or at the end of `part`
+        separators = self.positions(separator)
+        closing = separators[(separators > 0) & (self.buf[separators - 1] != ord(separator))]
+        count = np.searchsorted(closing, np.maximum(end, start + 1)) - np.searchsorted(closing, start + 1)
+        nonempty = end > start
+        count += (nonempty & (self.buf[np.maximum(end - 1, 0)] != ord(separator))).astype(np.int64)
+        return count
+
+
+def extract_enhanced_features_batch(urls):
+    """Columnar extract_enhanced_features for a whole URL column.
+
+    Returns a float DataFrame with FEATURE_NAMES columns, indexed like `urls`,
+    whose rows equal extract_enhanced_features(url) (all zeros where it falls
+    back to its error dict).
+    """
+    cols = UrlColumns(urls)
+    whole = (cols.starts, cols.ends)
+
+    length_url = cols.lengths
+    length_query = cols.length(cols.query)
+    length_fragment = cols.length(cols.fragment)
+    num_digits = cols.count(DIGIT_TABLE, *whole)
+    num_letters = cols.count(ALPHA_TABLE, *whole)
+    num_subdirectories = cols.segments(cols.path, '/')
+    directory_chars = cols.length(cols.path) - cols.count('/', *cols.path)
+
+    safe_length = np.maximum(length_url, 1)
+    safe_subdirectories = np.maximum(num_subdirectories, 1)
+    has_url = length_url > 0
+
+    columns = [
+        length_url, cols.length(cols.netloc), cols.length(cols.path), length_query, length_fragment,
+        cols.count('.', *whole), cols.count('-', *whole), cols.count('_', *whole), cols.count('/', *whole),
+        cols.count('=', *whole), cols.count('@', *whole), cols.count('&', *whole), cols.count('!', *whole),
+        cols.count(' ', *whole), cols.count('~', *whole),
+        cols.equals(cols.scheme, 'https', lower=True), cols.port != 0,
+        length_fragment > 0, length_query > 0, num_digits > 0,
+        num_digits, num_letters,
+        np.where(length_query > 0, cols.count('&', *cols.query) + 1, 0),
+        np.where(length_fragment > 0, cols.count('#', *cols.fragment) + 1, 0),
+        num_subdirectories,
+        np.where(has_url, num_digits / safe_length, 0.0),
+        np.where(has_url, num_letters / safe_length, 0.0),
+        np.where(has_url, (length_url - num_letters - num_digits) / safe_length, 0.0),
+        np.where(num_subdirectories > 0, directory_chars / safe_subdirectories, 0.0),
+        np.logical_or.reduce([cols.equals(cols.tld, tld) for tld in sorted(SUSPICIOUS_TLDS)]),
+    ]
+    features = np.column_stack([np.asarray(c, dtype=np.float64) for c in columns])
+
+    # urlparse(...).port raises on these, so extract_enhanced_features returns its zero fallback
+    features[cols.bad_port] = 0.0
+    for i in np.flatnonzero(cols.fallback):
+        row = extract_enhanced_features(cols.urls.iat[i])
+        features[i] = row if isinstance(row, list) else 0.0
+
+    return pd.DataFrame(features, columns=FEATURE_NAMES, index=cols.urls.index)
+
+
+def find_url_column(df):
+    """First string column containing 'http', or None"""
+    for col in df.columns:
+        if pd.api.types.is_string_dtype(df[col]) and df[col].str.contains('http', na=False).any():
+            return col
+    return None
+
+def find_label_column(df):
+    """Target column: 'label', else 'phishing', else the last column"""
+    if 'label' in df.columns:
+        return 'label'
+    if 'phishing' in df.columns:
+        return 'phishing'
+    return df.columns[-1]
+
+def featurize_chunk(urls, labels):
+    """Feature rows plus a 'label' column for one block of URLs"""
+    url_features = extract_enhanced_features_batch(urls)
+    url_features['label'] = labels
+    return url_features
+
+def encode_labels(labels):
+    """int8 label vector: 1 for phishing, 0 for anything else"""
+    return pd.Series(labels).isin(PHISHING_LABELS).to_numpy(dtype=np.int8)
+
+class NpyAppender:
+    """Write a .npy file row block by row block, without knowing the row count up front.
+
+    The header is written with a zero row count and rewritten on close(); numpy
+    pads it to a fixed 128 bytes, so the rewrite never moves the data.
+    """
+
+    def __init__(self, path, row_shape, dtype):
+        self.path = path
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+        self._data_offset = self._file.tell()
+
+    def _write_header(self):
+        np.lib.format.write_array_header_1_0(self._file, {
+            'descr': np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order': False,
+            'shape': (self.rows,) + self.row_shape,
+        })
+
+    def append(self, block):
+        block = np.ascontiguousarray(block, dtype=self.dtype)
+        if block.shape[1:] != self.row_shape:
+            raise ValueError(f"Expected rows of shape {self.row_shape}, got {block.shape[1:]}")
+        self._file.write(block.tobytes())
+        self.rows += len(block)
+
+    def close(self):
+        self._file.seek(0)
+        self._write_header()
+        if self._file.tell() != self._data_offset:
+            raise RuntimeError(f"Header of {self.path} changed size")
+        self._file.close()
+
+class BinaryDatasetWriter:
+    """Binary twin of the processed CSV: <directory>/features.npy (float32, N x 30) and labels.npy (int8, N).
+
+    Both files can be opened with np.load(..., mmap_mode='r'), so a reader only
+    pages in the rows it slices. scaler_stats.npz holds the per-feature count,
+    sum and sum of squares of all rows (NaN skipped), so the global scaler can
+    be built without reading features.npy again.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.features = NpyAppender(os.path.join(directory, 'features.npy'), (len(FEATURE_NAMES),), np.float32)
+        self.labels = NpyAppender(os.path.join(directory, 'labels.npy'), (), np.int8)
+        self.stats = {key: np.zeros(len(FEATURE_NAMES)) for key in ('count', 'sum', 'sumsq')}
+
+    def append(self, url_features):
+        block = url_features[FEATURE_NAMES].to_numpy(dtype=np.float32)
+        self.features.append(block)
+        self.labels.append(encode_labels(url_features['label']))
+        # Statistics of the stored float32 values, accumulated in float64
+        values = block.astype(np.float64)
+        present = ~np.isnan(values)
+        values[~present] = 0.0
+        self.stats['count'] += present.sum(axis=0)
+        self.stats['sum'] += values.sum(axis=0)
+        self.stats['sumsq'] += np.square(values).sum(axis=0)
+
+    def close(self):
+        self.features.close()
+        self.labels.close()
+        np.savez(os.path.join(self.directory, 'scaler_stats.npz'), **self.stats)
+
+def preprocess_dataset(input_file, output_file, binary_dir=None):
+    """Preprocess the phishing dataset with enhanced features.
+
+    With `binary_dir`, the features and labels are also written as memory-mappable
+    .npy files (see BinaryDatasetWriter); `output_file` may then be None to skip the CSV.
+    """
     print("Loading dataset...")
     df = pd.read_csv(input_file)
     
     # Find URL column
-    url_column = None
-    for col in df.columns:
-        if df[col].dtype == 'object' and df[col].str.contains('http', na=False).any():
-            url_column = col
-            break
+    url_column = find_url_column(df)
     
     if url_column is None:
         raise ValueError("Could not find URL column in dataset")
     
     print("Extracting enhanced features from URLs...")
-    url_features = pd.DataFrame([
-        extract_enhanced_features(url) for url in df[url_column]
-    ])
-    
     # Ensure the target column is included
-    if 'label' in df.columns:
-        url_features['label'] = df['label']
-    elif 'phishing' in df.columns:
-        url_features['label'] = df['phishing']
-    else:
-        url_features['label'] = df.iloc[:, -1]
+    url_features = featurize_chunk(df[url_column], df[find_label_column(df)])
     
     print("Saving processed dataset...")
-    url_features.to_csv(output_file, index=False)
+    if output_file is not None:
+        url_features.to_csv(output_file, index=False)
+    if binary_dir is not None:
+        writer = BinaryDatasetWriter(binary_dir)
+        writer.append(url_features)
+        writer.close()
+        print(f"Binary dataset written to {binary_dir}")
     print(f"Preprocessing complete. Features: {url_features.columns.tolist()}")
     print(f"Dataset shape: {url_features.shape}")
     
     return url_features
 
+def preprocess_dataset_streaming(input_file, output_file, chunksize=100000, workers=None, binary_dir=None):
+    """Streaming variant of preprocess_dataset for inputs that do not fit in memory.
+
+    Reads the CSV in chunks of `chunksize` rows, featurizes them on a pool of
+    `workers` processes (default: all available cores) and appends each result
+    to `output_file` in input order. At most 2 * workers chunks are in flight,
+    so peak memory is bounded by the chunk size, not the dataset size. The
+    output file is identical to preprocess_dataset's, and so is the binary
+    output when `binary_dir` is given. Returns the row count.
+    """
+    if workers is None:
+        workers = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    max_in_flight = 2 * workers
+
+    url_column = label_column = None
+    rows_written = 0
+    pending = deque()
+    writer = BinaryDatasetWriter(binary_dir) if binary_dir is not None else None
+
+    def write_next():
+        nonlocal rows_written
+        url_features = pending.popleft().result()
+        if output_file is not None:
+            url_features.to_csv(output_file, mode='w' if rows_written == 0 else 'a',
+                                header=rows_written == 0, index=False)
+        if writer is not None:
+            writer.append(url_features)
+        rows_written += len(url_features)
+        print(f"  {rows_written} rows written")
+
+    print(f"Streaming {input_file} in chunks of {chunksize} rows on {workers} workers...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in pd.read_csv(input_file, chunksize=chunksize):
+            if url_column is None:
+                url_column = find_url_column(chunk)
+                if url_column is None:
+                    raise ValueError("Could not find URL column in dataset")
+                label_column = find_label_column(chunk)
+            pending.append(pool.submit(featurize_chunk, chunk[url_column], chunk[label_column]))
+            if len(pending) >= max_in_flight:
+                write_next()
+        while pending:
+            write_next()
+    if writer is not None:
+        writer.close()
+
+    print(f"Preprocessing complete. Dataset rows: {rows_written}")
+    return rows_written
+
 if __name__ == "__main__":
-    input_file = "Training-Dataset/training_dataset_1.csv"
-    output_file = "Processed-Data/processed_training_dataset_30.csv"
+    parser = argparse.ArgumentParser(description="Extract the 30 enhanced URL features from a dataset")
+    parser.add_argument("input_file", nargs="?", default="Training-Dataset/training_dataset_1.csv")
+    parser.add_argument("output_file", nargs="?", default="Processed-Data/processed_training_dataset_30.csv")
+    parser.add_argument("--stream", action="store_true", help="chunked, multi-process mode for large inputs")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--binary-dir", default=None,
+                        help="also write memory-mappable features.npy/labels.npy into this directory")
+    args = parser.parse_args()
     
     try:
-        processed_df = preprocess_dataset(input_file, output_file)
-        print("\nSample of processed data:")
-        print(processed_df.head())
+        if args.stream:
+            preprocess_dataset_streaming(args.input_file, args.output_file, args.chunksize, args.workers,
+                                         binary_dir=args.binary_dir)
+        else:
+            processed_df = preprocess_dataset(args.input_file, args.output_file, binary_dir=args.binary_dir)
+            print("\nSample of processed data:")
+            print(processed_df.head())
     except Exception as e:
         print(f"Error during preprocessing: {str(e)}")
\ No newline at end of file
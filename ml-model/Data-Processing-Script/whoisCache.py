@@ -0,0 +1,159 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import whois
+
+# Default location of the shared cache database; override with WHOIS_CACHE_PATH
+DEFAULT_CACHE_PATH = 'ml-model/Data-Processing-Script/cache/whois_cache.sqlite3'
+
+# Creation/expiry dates change on a scale of months; failed lookups are retried much sooner
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 3600
+
+# Second-level labels under which registrations happen one level deeper (e.g. example.co.uk)
+MULTI_PART_SUFFIXES = {
+    'ac', 'co', 'com', 'edu', 'gov', 'gv', 'ltd', 'me', 'mil', 'net', 'ne', 'nic', 'nom', 'or', 'org', 'plc', 'sch',
+}
+
+
+class WhoisLookupError(Exception):
+    """Raised for domains whose last lookup failed and is still negatively cached"""
+
+
+def registeredDomain(netloc):
+    """Reduce a netloc to the registered domain: 'WWW.Shop.Example.co.uk:8080' -> 'example.co.uk'"""
+    host = netloc.rsplit('@', 1)[-1].strip().lower()
+    if host.startswith('['):
+        return host.split(']', 1)[0] + ']'  # IPv6 literal
+    host = host.split(':', 1)[0].rstrip('.')
+
+    labels = [label for label in host.split('.') if label]
+    if len(labels) <= 2 or all(label.isdigit() for label in labels):
+        return '.'.join(labels)
+    if len(labels[-1]) == 2 and labels[-2] in MULTI_PART_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def _encode_date(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, list):
+        return [_encode_date(v) for v in value]
+    return value
+
+
+def _decode_date(value):
+    if isinstance(value, dict) and '__datetime__' in value:
+        return datetime.fromisoformat(value['__datetime__'])
+    if isinstance(value, list):
+        return [_decode_date(v) for v in value]
+    return value
+
+
+class WhoisCache:
+    """SQLite-backed cache of the WHOIS fields used by ef.domainAge / ef.domainEnd.
+
+    Keyed by registered domain, so every URL on a domain shares one lookup. The
+    database is opened in WAL mode, which lets several worker processes read and
+    write it concurrently, and it survives restarts.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS whois_cache ('
+            ' domain TEXT PRIMARY KEY,'
+            ' ok INTEGER NOT NULL,'
+            ' creation_date TEXT,'
+            ' expiration_date TEXT,'
+            ' fetched_at REAL NOT NULL)'
+        )
+        conn.commit()
+        # A forked worker process must open its own connections, not reuse the parent's
+        os.register_at_fork(after_in_child=self._forgetConnections)
+
+    def _forgetConnections(self):
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, domain):
+        """Return (hit, record); record is None for a negatively cached domain"""
+        row = self._connection().execute(
+            'SELECT ok, creation_date, expiration_date, fetched_at FROM whois_cache WHERE domain = ?', (domain,)
+        ).fetchone()
+        if row is None:
+            return False, None
+        ok, creation_date, expiration_date, fetched_at = row
+        if time.time() - fetched_at > (self.ttl if ok else self.negative_ttl):
+            return False, None
+        if not ok:
+            return True, None
+        return True, SimpleNamespace(
+            creation_date=_decode_date(json.loads(creation_date)),
+            expiration_date=_decode_date(json.loads(expiration_date)),
+        )
+
+    def put(self, domain, record):
+        self._store(domain, 1,
+                    json.dumps(_encode_date(getattr(record, 'creation_date', None))),
+                    json.dumps(_encode_date(getattr(record, 'expiration_date', None))))
+
+    def putFailure(self, domain):
+        self._store(domain, 0, None, None)
+
+    def _store(self, domain, ok, creation_date, expiration_date):
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO whois_cache (domain, ok, creation_date, expiration_date, fetched_at)'
+            ' VALUES (?, ?, ?, ?, ?)',
+            (domain, ok, creation_date, expiration_date, time.time()),
+        )
+        conn.commit()
+
+    def lookup(self, netloc, timeout=10):
+        """whois.whois replacement: cached record, or a live lookup (socket timeout in seconds) whose outcome is cached"""
+        domain = registeredDomain(netloc)
+        hit, record = self.get(domain)
+        if hit:
+            if record is None:
+                raise WhoisLookupError(domain)
+            return record
+        try:
+            record = whois.whois(domain, timeout=timeout)
+        except Exception:
+            self.putFailure(domain)
+            raise
+        self.put(domain, record)
+        return record
+
+
+def cacheFromEnv():
+    """WhoisCache configured from WHOIS_CACHE_PATH / WHOIS_CACHE_TTL / WHOIS_CACHE_NEGATIVE_TTL, or None if WHOIS_CACHE=0"""
+    if os.environ.get('WHOIS_CACHE', '1') == '0':
+        return None
+    return WhoisCache(
+        path=os.environ.get('WHOIS_CACHE_PATH', DEFAULT_CACHE_PATH),
+        ttl=float(os.environ.get('WHOIS_CACHE_TTL', DEFAULT_TTL)),
+        negative_ttl=float(os.environ.get('WHOIS_CACHE_NEGATIVE_TTL', DEFAULT_NEGATIVE_TTL)),
+    )
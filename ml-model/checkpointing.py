@@ -0,0 +1,162 @@
+# checkpointing.py (used by server.py)
+"""Background checkpoint writer for the aggregated global weights.
+
+aggregate_fit only hands the weight arrays to a queue; a writer thread saves
+them as raw arrays (.npz), each via a temp file + rename so a crash never
+leaves a truncated checkpoint. Only the last `keep_last` rounds plus the best
+round by evaluation loss are kept on disk.
+"""
+import json
+import os
+import queue
+import tempfile
+import threading
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+
+
+def checkpoint_path(directory, rnd):
+    return os.path.join(directory, f"round_{rnd:04d}.npz")
+
+
+def load_checkpoint(path):
+    """Weight list, in model.get_weights() order, from a checkpoint written by CheckpointWriter"""
+    with np.load(path) as data:
+        return [data[f"arr_{i}"] for i in range(len(data.files))]
+
+
+def _atomic_write(path, write):
+    """Call write(file) on a temp file in the target directory, then rename it over `path`"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class CheckpointWriter:
+    """Saves checkpoints off the aggregation path and applies the retention policy.
+
+    build_model/final_path: on the final round the weights are also written as a
+    full Keras model (the serving artifact), atomically as well. If the run
+    completed but the final round produced no weights, close(completed=True)
+    writes it from the latest checkpoint; an interrupted run never touches it.
+    """
+
+    def __init__(self, directory, keep_last=3, final_path=None, build_model=None):
+        self.directory = directory
+        # The newest round is always kept until its evaluation score has arrived
+        self.keep_last = max(1, keep_last)
+        self.final_path = final_path
+        self.build_model = build_model
+        self.saved_rounds = []
+        self.best = None  # (loss, round)
+        self.scores = {}
+        self.final_written = False
+        self._queue = queue.Queue()
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, rnd, weights, final=False):
+        """Queue the round's aggregated weights; returns immediately"""
+        self._queue.put(("save", rnd, [np.asarray(w) for w in weights], final))
+
+    def record_score(self, rnd, loss):
+        """Evaluation loss of the weights aggregated in round `rnd`; lowest is kept as best"""
+        self._queue.put(("score", rnd, float(loss), None))
+
+    def close(self, completed=False):
+        """Wait for every queued checkpoint to be written.
+
+        completed: every round ran, so make sure the final model exists. Leave it
+        False on a crash or Ctrl-C so a partial run cannot replace the served model.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        if completed and self.final_path is not None and not self.final_written and self.saved_rounds:
+            rnd = max(self.saved_rounds)
+            print(f"⚠️ Final round produced no weights, writing the final model from round {rnd}")
+            try:
+                self._save_final(load_checkpoint(checkpoint_path(self.directory, rnd)))
+            except Exception as e:
+                print(f"❌ Error writing the final model from round {rnd}: {str(e)}")
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            kind, rnd, payload, final = item
+            try:
+                if kind == "save":
+                    self._save(rnd, payload, final)
+                else:
+                    self._score(rnd, payload)
+            except Exception as e:
+                print(f"❌ Error writing checkpoint for round {rnd}: {str(e)}")
+
+    def _save(self, rnd, weights, final):
+        _atomic_write(checkpoint_path(self.directory, rnd), lambda f: np.savez(f, *weights))
+        if rnd not in self.saved_rounds:
+            self.saved_rounds.append(rnd)
+        print(f"✅ Checkpoint for round {rnd} saved")
+
+        if final and self.final_path is not None:
+            self._save_final(weights)
+        self._prune()
+
+    def _save_final(self, weights):
+        model = self.build_model()
+        model.set_weights(weights)
+        os.makedirs(os.path.dirname(self.final_path) or ".", exist_ok=True)
+        # Keras picks the format from the extension, so the temp file keeps it
+        tmp_path = os.path.join(os.path.dirname(self.final_path) or ".",
+                                f".tmp-{os.getpid()}-{os.path.basename(self.final_path)}")
+        try:
+            model.save(tmp_path)
+            os.replace(tmp_path, self.final_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.final_written = True
+        print(f"🎯 Final model saved as {os.path.basename(self.final_path)}")
+
+    def _score(self, rnd, loss):
+        self.scores[rnd] = loss
+        if self.best is None or loss < self.best[0]:
+            self.best = (loss, rnd)
+        self._prune()
+
+    def _prune(self):
+        keep = set(self.saved_rounds[-self.keep_last:])
+        if self.best is not None:
+            keep.add(self.best[1])
+        for rnd in [r for r in self.saved_rounds if r not in keep]:
+            path = checkpoint_path(self.directory, rnd)
+            if os.path.exists(path):
+                os.remove(path)
+            self.saved_rounds.remove(rnd)
+        self._write_index()
+
+    def _write_index(self):
+        index = {
+            "rounds": {str(rnd): os.path.basename(checkpoint_path(self.directory, rnd)) for rnd in self.saved_rounds},
+            "best": None if self.best is None else {
+                "round": self.best[1],
+                "loss": self.best[0],
+                "file": os.path.basename(checkpoint_path(self.directory, self.best[1])),
+            },
+            "scores": {str(rnd): loss for rnd, loss in sorted(self.scores.items())},
+        }
+        _atomic_write(os.path.join(self.directory, INDEX_FILE),
+                      lambda f: f.write(json.dumps(index, indent=2).encode("utf-8")))
@@ -10,39 +10,135 @@ from ucimlrepo import fetch_ucirepo
 import sys
 import os
 import joblib
+from compression import encode_update, is_enabled
+from federated_scaler import shard_statistics, scaler_from_statistics, encode_arrays, decode_scaler
+
+CSV_DATA_PATH = "Processed-Data/processed_training_dataset_30.csv"
+# Written by preprocess_data_30_feature.py --binary-dir; preferred over the CSV when present
+BINARY_DATA_DIR = "Processed-Data/processed_training_dataset_30"
+
+# Global feature count/sum/sumsq written next to the .npy files by BinaryDatasetWriter
+BINARY_SCALER_STATS = os.path.join(BINARY_DATA_DIR, "scaler_stats.npz")
+
+# Rows per block when a binary dataset without scaler_stats.npz has to be scanned for the scaler
+SCALER_FIT_BLOCK_ROWS = 65536
+
+# FEDERATED_SCALER=1: load only this client's shard, unscaled, and standardize it with the
+# global scaler the server builds from every client's statistics (see federated_scaler.py)
+FEDERATED_SCALER = os.environ.get("FEDERATED_SCALER", "0") == "1"
+
+# Training settings used when the server's fit config does not carry them
+DEFAULT_FIT_CONFIG = {
+    "epochs": 5, "batch_size": 16, "shuffle_buffer": 0, "validation_split": 0.1,
+    "compression": "none", "topk": 0.0,
+}
+
+def partition_bounds(client_id: int, total_clients: int, n_rows: int):
+    """[start, end) row range owned by a client; the last client takes the remainder"""
+    samples_per_client = n_rows // total_clients
+    start_idx = client_id * samples_per_client
+    end_idx = start_idx + samples_per_client if client_id < total_clients - 1 else n_rows
+    return start_idx, end_idx
+
+def save_scaler(scaler, client_id: int):
+    # Save the fitted scaler ONLY for client 0 (global reference)
+    if client_id == 0:
+        os.makedirs("Trained-Model", exist_ok=True)
+        joblib.dump(scaler, "Trained-Model/standard_scaler.pkl")
+        print("✅ StandardScaler saved successfully.")
 
 def load_client_data(client_id: int, total_clients: int):
-    """Load and partition data for a specific client from local CSV"""
+    """Load and partition data for a specific client, from the binary dataset if present, else the CSV"""
+    if os.path.exists(os.path.join(BINARY_DATA_DIR, "features.npy")):
+        return load_client_data_binary(client_id, total_clients)
+
     print(f"Loading dataset for client {client_id} from local CSV...")
 
     # Load CSV file
-    df = pd.read_csv("Processed-Data/processed_training_dataset_30.csv")  # Ensure the correct filename
+    df = pd.read_csv(CSV_DATA_PATH)  # Ensure the correct filename
     
     # Separate features (X) and target (y)
     X = df.iloc[:, :-1].values  # All columns except the last one as features
-    y = df.iloc[:, -1].values   # Last column as target (phishing or not)
+    y = df.iloc[:, -1]          # Last column as target (phishing or not)
 
-    # Ensure y is binary (0 or 1)
-    y = (y == 1).astype(int)
+    # Ensure y is binary (0 or 1); labels may be 0/1 or 'legitimate'/'phishing'
+    y = y.isin([1, '1', 'phishing']).astype(int).values
 
     # Standardize features
     scaler = StandardScaler()
     X = scaler.fit_transform(X)
-
-    # Save the fitted scaler ONLY for client 0 (global reference)
-    if client_id == 0:
-        os.makedirs("Trained-Model", exist_ok=True)
-        joblib.dump(scaler, "Trained-Model/standard_scaler.pkl")
-        print("✅ StandardScaler saved successfully.")
+    # Missing values (e.g. directory_length_mean of a URL without directories) -> feature mean;
+    # a single NaN input turns the first Dense kernel into NaN after one step
+    X = np.nan_to_num(X, nan=0.0)
+    save_scaler(scaler, client_id)
 
     # Partition data for this client
-    samples_per_client = len(X) // total_clients
-    start_idx = client_id * samples_per_client
-    end_idx = start_idx + samples_per_client if client_id < total_clients - 1 else len(X)
+    start_idx, end_idx = partition_bounds(client_id, total_clients, len(X))
 
     print(f"Client {client_id} data shape: {X[start_idx:end_idx].shape}")
     return X[start_idx:end_idx], y[start_idx:end_idx]
 
+def load_client_data_binary(client_id: int, total_clients: int):
+    """Memory-map features.npy/labels.npy and copy only this client's rows into memory"""
+    print(f"Loading dataset for client {client_id} from {BINARY_DATA_DIR}...")
+
+    X_all = np.load(os.path.join(BINARY_DATA_DIR, "features.npy"), mmap_mode="r")
+    y_all = np.load(os.path.join(BINARY_DATA_DIR, "labels.npy"), mmap_mode="r")
+
+    # Same global scaler as the CSV path, from the statistics saved at preprocessing time,
+    # so only this client's rows of features.npy are ever read
+    if os.path.exists(BINARY_SCALER_STATS):
+        with np.load(BINARY_SCALER_STATS) as stats:
+            scaler = scaler_from_statistics({key: stats[key] for key in stats.files})
+    else:
+        print(f"⚠️ {BINARY_SCALER_STATS} missing (re-run preprocessing with --binary-dir); "
+              "fitting the scaler over the whole dataset")
+        scaler = StandardScaler()
+        for block_start in range(0, len(X_all), SCALER_FIT_BLOCK_ROWS):
+            scaler.partial_fit(X_all[block_start:block_start + SCALER_FIT_BLOCK_ROWS])
+    save_scaler(scaler, client_id)
+
+    start_idx, end_idx = partition_bounds(client_id, total_clients, len(X_all))
+    X = np.nan_to_num(scaler.transform(np.asarray(X_all[start_idx:end_idx])), nan=0.0)
+    y = np.asarray(y_all[start_idx:end_idx]).astype(int)
+
+    print(f"Client {client_id} data shape: {X.shape}")
+    return X, y
+
+def load_client_shard(client_id: int, total_clients: int, shard_path=None):
+    """Unscaled (X, y) for this client only; nothing outside the shard is parsed or kept in memory.
+
+    shard_path is the client's own dataset (a processed CSV, or a directory with
+    features.npy/labels.npy). Without it, the client's row range of the shared
+    processed dataset is read.
+    """
+    if shard_path is not None:
+        print(f"Loading local shard for client {client_id} from {shard_path}...")
+        if os.path.isdir(shard_path):
+            X = np.load(os.path.join(shard_path, "features.npy"))
+            y = np.load(os.path.join(shard_path, "labels.npy"))
+        else:
+            df = pd.read_csv(shard_path)
+            X, y = df.iloc[:, :-1].values, df.iloc[:, -1].isin([1, '1', 'phishing']).values
+    elif os.path.exists(os.path.join(BINARY_DATA_DIR, "features.npy")):
+        print(f"Loading shard {client_id} of {total_clients} from {BINARY_DATA_DIR}...")
+        X_all = np.load(os.path.join(BINARY_DATA_DIR, "features.npy"), mmap_mode="r")
+        y_all = np.load(os.path.join(BINARY_DATA_DIR, "labels.npy"), mmap_mode="r")
+        start_idx, end_idx = partition_bounds(client_id, total_clients, len(X_all))
+        X, y = np.asarray(X_all[start_idx:end_idx]), np.asarray(y_all[start_idx:end_idx])
+    else:
+        print(f"Loading shard {client_id} of {total_clients} from local CSV...")
+        with open(CSV_DATA_PATH, "rb") as f:
+            n_rows = sum(1 for _ in f) - 1
+        start_idx, end_idx = partition_bounds(client_id, total_clients, n_rows)
+        # Rows outside the range are skipped as raw lines, without float parsing
+        df = pd.read_csv(CSV_DATA_PATH, skiprows=range(1, start_idx + 1), nrows=end_idx - start_idx)
+        X, y = df.iloc[:, :-1].values, df.iloc[:, -1].isin([1, '1', 'phishing']).values
+
+    X, y = X.astype(np.float64), y.astype(int)
+    print(f"Client {client_id} shard shape: {X.shape}")
+    return X, y
+
 def create_phishing_model():
     inputs = keras.layers.Input(shape=(30,))
     x = keras.layers.Dense(128, activation='relu')(inputs)
@@ -61,35 +157,106 @@ def create_phishing_model():
 
 
 class PhishingClient(fl.client.NumPyClient):
-    def __init__(self, client_id: int, total_clients: int):
+    def __init__(self, client_id: int, total_clients: int, shard_path=None, federated_scaler=None):
         self.model = create_phishing_model()
+        if federated_scaler is None:
+            federated_scaler = FEDERATED_SCALER or shard_path is not None
+        self.federated_scaler = federated_scaler
+        self.scaled = not self.federated_scaler
         
         # Load and split data
         print(f"Initializing client {client_id}...")
-        X, y = load_client_data(client_id, total_clients)
+        if self.federated_scaler:
+            X, y = load_client_shard(client_id, total_clients, shard_path)
+            self.scaler_statistics = shard_statistics(X)
+        else:
+            X, y = load_client_data(client_id, total_clients)
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
         )
+        self.pipelines = {}
+        self.residuals = None  # compression error carried over to the next update
         print(f"Client {client_id} initialized with {len(self.X_train)} training samples")
     
+    def get_properties(self, config):
+        # The server asks for the shard statistics once, before the first round
+        if self.federated_scaler and config.get("request") == "scaler_statistics":
+            return encode_arrays(self.scaler_statistics)
+        return {}
+
+    def apply_scaler(self, config):
+        """Standardize the shard with the global scaler from the server's config (once)"""
+        if self.scaled:
+            return
+        received = decode_scaler(config)
+        if received is None:
+            # Server is not aggregating statistics: fall back to this shard's own scaler
+            print("⚠️ No global scaler from server, standardizing with shard statistics")
+            local_scaler = scaler_from_statistics(self.scaler_statistics)
+            mean, scale = local_scaler.mean_, local_scaler.scale_
+        else:
+            mean, scale = received
+        self.X_train = np.nan_to_num((self.X_train - mean) / scale, nan=0.0)
+        self.X_test = np.nan_to_num((self.X_test - mean) / scale, nan=0.0)
+        self.scaled = True
+
+    def training_pipeline(self, batch_size, shuffle_buffer, validation_split):
+        """Cached, shuffled, batched and prefetched tf.data datasets for (train, validation).
+
+        Like Keras' validation_split, the validation rows are the last ones of the
+        training set. Built once per setting and reused across rounds.
+        """
+        key = (batch_size, shuffle_buffer, validation_split)
+        if key not in self.pipelines:
+            X = self.X_train.astype(np.float32)
+            y = self.y_train.astype(np.float32)
+            split = int(len(X) * (1.0 - validation_split))
+            buffer_size = shuffle_buffer if shuffle_buffer > 0 else split
+
+            train = (tf.data.Dataset.from_tensor_slices((X[:split], y[:split]))
+                     .cache()
+                     .shuffle(max(buffer_size, 1), reshuffle_each_iteration=True)
+                     .batch(batch_size)
+                     .prefetch(tf.data.AUTOTUNE))
+            validation = None
+            if split < len(X):
+                validation = (tf.data.Dataset.from_tensor_slices((X[split:], y[split:]))
+                              .batch(batch_size)
+                              .cache()
+                              .prefetch(tf.data.AUTOTUNE))
+            self.pipelines[key] = (train, validation)
+        return self.pipelines[key]
+
     def get_parameters(self, config):
         return self.model.get_weights()
     
     def fit(self, parameters, config):
+        self.apply_scaler(config)
         self.model.set_weights(parameters)
+        settings = {key: config.get(key, default) for key, default in DEFAULT_FIT_CONFIG.items()}
+        train, validation = self.training_pipeline(
+            int(settings["batch_size"]), int(settings["shuffle_buffer"]), float(settings["validation_split"])
+        )
         history = self.model.fit(
-            self.X_train, self.y_train,
-            epochs=5,
-            batch_size=16,
-            validation_split=0.1,
+            train,
+            validation_data=validation,
+            epochs=int(settings["epochs"]),
             verbose=1
         )
         print(f"Training completed - Loss: {history.history['loss'][-1]:.4f}")
-        return self.model.get_weights(), len(self.X_train), {
+
+        weights = self.model.get_weights()
+        if is_enabled(settings["compression"], float(settings["topk"])):
+            # Send the quantized/sparsified delta to the received global weights instead
+            weights, self.residuals = encode_update(
+                weights, parameters, settings["compression"], float(settings["topk"]), self.residuals
+            )
+        return weights, len(self.X_train), {
             "loss": history.history["loss"][-1]
         }
     
     def evaluate(self, parameters, config):
+        self.apply_scaler(config)
         self.model.set_weights(parameters)
         loss, accuracy = self.model.evaluate(self.X_test, self.y_test, verbose=0)
         print(f"Evaluation - Loss: {loss:.4f}, Accuracy: {accuracy:.4f}")
@@ -97,20 +264,21 @@ class PhishingClient(fl.client.NumPyClient):
 
 def main():
     # Parse command line arguments
-    if len(sys.argv) != 4:
-        print("Usage: python client.py <client_id> <total_clients> <server_ip>")
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python client.py <client_id> <total_clients> <server_ip> [local_shard_path]")
         sys.exit(1)
     
     client_id = int(sys.argv[1])
     total_clients = int(sys.argv[2])
     server_ip = sys.argv[3]
+    shard_path = sys.argv[4] if len(sys.argv) == 5 else None
     
     print(f"Starting client {client_id} of {total_clients} total clients")
     print(f"Connecting to server at {server_ip}:8080")
     
     try:
         # Initialize and start client
-        client = PhishingClient(client_id, total_clients)
+        client = PhishingClient(client_id, total_clients, shard_path)
         print(f"Client {client_id} initialized successfully, attempting to connect to server...")
         
         fl.client.start_numpy_client(
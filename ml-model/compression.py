@@ -0,0 +1,125 @@
+# compression.py (shared by client.py and server.py)
+"""Compressed model updates for the Flower exchange.
+
+Instead of its full float32 weights, a client sends the delta to the global
+weights it received, quantized to float16 or int8 (one scale per tensor) and
+optionally sparsified to the top-k fraction of entries by magnitude. The whole
+update travels as four arrays:
+
+    values   all kept entries, concatenated (float32 / float16 / int8)
+    scales   float32, one per tensor (1.0 unless int8)
+    counts   int32, number of kept entries per tensor
+    indices  int32, flat positions of the kept entries (empty when dense)
+
+The part of the delta lost to quantization/sparsification is carried over to
+the client's next update (error feedback), so it is delayed rather than dropped.
+"""
+import numpy as np
+
+MODES = ("none", "float16", "int8")
+VALUE_DTYPES = {"none": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def is_enabled(mode, topk):
+    return mode != "none" or topk > 0
+
+
+def _quantize(values, mode):
+    if mode == "int8":
+        peak = float(np.max(np.abs(values), initial=0.0))
+        scale = peak / 127.0 if peak > 0 else 1.0
+        return np.clip(np.round(values / scale), -127, 127).astype(np.int8), scale
+    return values.astype(VALUE_DTYPES[mode]), 1.0
+
+
+def encode_update(weights, global_weights, mode="none", topk=0.0, residuals=None):
+    """(arrays to send, residuals for the next round) for a client's trained weights"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown compression mode: {mode}")
+    values, scales, counts, indices, new_residuals = [], [], [], [], []
+
+    for i, (w, g) in enumerate(zip(weights, global_weights)):
+        delta = (np.asarray(w, dtype=np.float32) - np.asarray(g, dtype=np.float32)).ravel()
+        if residuals is not None:
+            delta = delta + residuals[i]
+
+        if topk > 0:
+            k = max(1, int(np.ceil(topk * delta.size)))
+            kept = np.sort(np.argpartition(np.abs(delta), -k)[-k:]) if k < delta.size else np.arange(delta.size)
+            q, scale = _quantize(delta[kept], mode)
+            indices.append(kept.astype(np.int32))
+        else:
+            kept = None
+            q, scale = _quantize(delta, mode)
+
+        sent = np.zeros_like(delta)
+        if kept is None:
+            sent[:] = q.astype(np.float32) * scale
+        else:
+            sent[kept] = q.astype(np.float32) * scale
+        new_residuals.append(delta - sent)
+
+        values.append(q)
+        scales.append(scale)
+        counts.append(q.size)
+
+    arrays = [
+        np.concatenate(values) if values else np.zeros(0, VALUE_DTYPES[mode]),
+        np.asarray(scales, dtype=np.float32),
+        np.asarray(counts, dtype=np.int32),
+        np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+    ]
+    return arrays, new_residuals
+
+
+def decode_update(arrays, global_weights):
+    """Full weights (global + decoded delta) from the arrays built by encode_update"""
+    values, scales, counts, indices = arrays
+    sparse = indices.size > 0
+    weights = []
+    offset = 0
+    for g, scale, count in zip(global_weights, scales, counts):
+        g = np.asarray(g, dtype=np.float32)
+        chunk = values[offset:offset + count].astype(np.float32) * scale
+        delta = np.zeros(g.size, dtype=np.float32)
+        if sparse:
+            delta[indices[offset:offset + count]] = chunk
+        else:
+            delta[:] = chunk
+        offset += count
+        weights.append(g + delta.reshape(g.shape))
+    return weights
+
+
+def is_compressed(arrays, global_weights):
+    """True for a payload built by encode_update (as opposed to plain full weights)"""
+    return (len(arrays) == 4 and len(global_weights) != 4
+            and arrays[2].dtype == np.int32 and arrays[2].size == len(global_weights))
+
+
+def payload_bytes(arrays):
+    return int(sum(np.asarray(a).nbytes for a in arrays))
+
+
+if __name__ == "__main__":
+    # Size and reconstruction error per setting, for a synthetic update on a trained model:
+    #   python compression.py [model.h5]
+    import sys
+    import tensorflow as tf
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "Trained-Model/final_30_features_model.h5"
+    global_weights = [np.nan_to_num(w) for w in tf.keras.models.load_model(model_path).get_weights()]
+    rng = np.random.default_rng(0)
+    trained = [g + rng.normal(0.0, 0.01, g.shape).astype(np.float32) for g in global_weights]
+    full_bytes = payload_bytes(trained)
+    true_delta = np.concatenate([(t - g).ravel() for t, g in zip(trained, global_weights)])
+
+    print(f"{'mode':<8} {'topk':>5} {'bytes':>8} {'ratio':>6} {'rel. error':>10}")
+    for mode in MODES:
+        for topk in (0.0, 0.1):
+            arrays, _ = encode_update(trained, global_weights, mode, topk)
+            decoded = decode_update(arrays, global_weights)
+            delta = np.concatenate([(d - g).ravel() for d, g in zip(decoded, global_weights)])
+            error = np.linalg.norm(delta - true_delta) / np.linalg.norm(true_delta)
+            size = payload_bytes(arrays)
+            print(f"{mode:<8} {topk:>5} {size:>8} {full_bytes / size:>6.1f} {error:>10.4f}")
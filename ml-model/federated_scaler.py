@@ -0,0 +1,99 @@
+# federated_scaler.py (shared by client.py and server.py)
+"""Global StandardScaler built from per-client sufficient statistics.
+
+Each client reports count, sum and sum of squares of its own shard; the server
+adds them up and turns the totals into one StandardScaler, so no client ever
+needs the full dataset. NaN entries are skipped per feature, like
+StandardScaler.fit does.
+"""
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+STAT_KEYS = ("count", "sum", "sumsq")
+
+
+def shard_statistics(X):
+    """Per-feature count, sum and sum of squares of one shard (float64)"""
+    X = np.asarray(X, dtype=np.float64)
+    present = ~np.isnan(X)
+    values = np.where(present, X, 0.0)
+    return {
+        "count": present.sum(axis=0).astype(np.float64),
+        "sum": values.sum(axis=0),
+        "sumsq": np.square(values).sum(axis=0),
+    }
+
+
+def combine_statistics(all_stats):
+    """Element-wise total of several shard_statistics() results"""
+    all_stats = list(all_stats)
+    if not all_stats:
+        raise ValueError("No scaler statistics to combine")
+    return {key: np.sum([stats[key] for stats in all_stats], axis=0) for key in STAT_KEYS}
+
+
+def scaler_from_statistics(stats):
+    """Fitted StandardScaler equivalent to fitting on the union of the shards"""
+    count = stats["count"]
+    safe_count = np.maximum(count, 1.0)
+    mean = stats["sum"] / safe_count
+    var = np.maximum(stats["sumsq"] / safe_count - np.square(mean), 0.0)
+    scale = np.sqrt(var)
+    scale[scale < 10 * np.finfo(np.float64).eps] = 1.0  # constant features, as StandardScaler does
+
+    scaler = StandardScaler()
+    scaler.mean_ = mean
+    scaler.var_ = var
+    scaler.scale_ = scale
+    scaler.n_features_in_ = len(mean)
+    scaler.n_samples_seen_ = count.astype(np.int64)
+    return scaler
+
+
+# Flower config/metric values must be scalars, so arrays travel as float64 bytes
+
+def encode_arrays(arrays, prefix=""):
+    return {f"{prefix}{key}": np.asarray(value, dtype=np.float64).tobytes() for key, value in arrays.items()}
+
+
+def decode_arrays(values, keys, prefix=""):
+    return {key: np.frombuffer(values[f"{prefix}{key}"], dtype=np.float64) for key in keys}
+
+
+def encode_scaler(scaler):
+    """Fit/evaluate config entries carrying the global scaler to the clients"""
+    return encode_arrays({"mean": scaler.mean_, "scale": scaler.scale_}, prefix="scaler_")
+
+
+def decode_scaler(config):
+    """(mean, scale) from a config built by encode_scaler, or None if the server sent none"""
+    if "scaler_mean" not in config:
+        return None
+    arrays = decode_arrays(config, ("mean", "scale"), prefix="scaler_")
+    return arrays["mean"], arrays["scale"]
+
+
+if __name__ == "__main__":
+    # Check: combining shard statistics gives the same scaler as fitting on all rows
+    #   python federated_scaler.py [processed.csv] [num_shards]
+    import sys
+    import pandas as pd
+
+    data_path = sys.argv[1] if len(sys.argv) > 1 else "Processed-Data/processed_training_dataset_30.csv"
+    num_shards = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    X = pd.read_csv(data_path).iloc[:, :-1].values.astype(float)
+    reference = StandardScaler().fit(X)
+    combined = scaler_from_statistics(combine_statistics(
+        shard_statistics(shard) for shard in np.array_split(X, num_shards)))
+
+    mean_diff = float(np.max(np.abs(reference.mean_ - combined.mean_)))
+    scale_diff = float(np.max(np.abs(reference.scale_ - combined.scale_) / reference.scale_))
+    transform_diff = float(np.nanmax(np.abs(reference.transform(X) - combined.transform(X))))
+    print(f"Shards: {num_shards}  max |mean diff|: {mean_diff:.3e}  max rel scale diff: {scale_diff:.3e}  "
+          f"max |transform diff|: {transform_diff:.3e}")
+
+    if max(mean_diff, scale_diff, transform_diff) > 1e-6:
+        print("❌ Federated scaler does not match StandardScaler")
+        sys.exit(1)
+    print("✅ Federated scaler matches StandardScaler")
@@ -2,8 +2,53 @@ import flwr as fl
 import tensorflow as tf
 from tensorflow import keras
 import os
+import json
+import math
+import time
+import concurrent.futures
 import joblib
-from flwr.common import parameters_to_ndarrays
+from flwr.common import parameters_to_ndarrays, ndarrays_to_parameters, Code, GetPropertiesIns
+from flwr.server.server import evaluate_clients
+from checkpointing import CheckpointWriter
+from compression import MODES, decode_update, is_compressed
+from federated_scaler import STAT_KEYS, combine_statistics, scaler_from_statistics, decode_arrays, encode_scaler
+
+# FEDERATED_SCALER=1: build the global StandardScaler from the clients' shard statistics
+# before the first round and send it to them with every fit/evaluate instruction
+FEDERATED_SCALER = os.environ.get("FEDERATED_SCALER", "0") == "1"
+SCALER_STATS_TIMEOUT = float(os.environ.get("SCALER_STATS_TIMEOUT", 120))
+
+NUM_ROUNDS = int(os.environ.get("NUM_ROUNDS", 10))
+
+# Raw-weight checkpoints of the last CHECKPOINT_KEEP_LAST rounds plus the best one by evaluation loss
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", "Trained-Model/checkpoints")
+CHECKPOINT_KEEP_LAST = int(os.environ.get("CHECKPOINT_KEEP_LAST", 3))
+FINAL_MODEL_PATH = "Trained-Model/final_30_features_model.h5"
+SCALER_PATH = "Trained-Model/standard_scaler.pkl"
+
+# Client training settings, sent with every fit instruction so they can be tuned without redeploying clients
+FIT_EPOCHS = int(os.environ.get("FIT_EPOCHS", 5))
+FIT_BATCH_SIZE = int(os.environ.get("FIT_BATCH_SIZE", 16))
+FIT_SHUFFLE_BUFFER = int(os.environ.get("FIT_SHUFFLE_BUFFER", 0))  # 0: shuffle the whole training set
+FIT_VALIDATION_SPLIT = float(os.environ.get("FIT_VALIDATION_SPLIT", 0.1))
+
+# Client update compression (see compression.py): COMPRESSION=none|float16|int8, COMPRESSION_TOPK=fraction kept
+COMPRESSION = os.environ.get("COMPRESSION", "none")
+COMPRESSION_TOPK = float(os.environ.get("COMPRESSION_TOPK", 0.0))
+if COMPRESSION not in MODES:
+    raise ValueError(f"COMPRESSION must be one of {MODES}, got {COMPRESSION!r}")
+
+# Straggler handling (DeadlineStrategy + DeadlineServer), enabled by ROUND_DEADLINE > 0 or ROUND_QUORUM < 1:
+# a fit round closes ROUND_DEADLINE seconds after it starts or once ROUND_QUORUM of the sampled clients
+# answered, whichever comes first. Late updates are dropped or staleness-weighted (LATE_UPDATES).
+ROUND_DEADLINE = float(os.environ.get("ROUND_DEADLINE", 0))
+ROUND_QUORUM = float(os.environ.get("ROUND_QUORUM", 1.0))
+LATE_UPDATES = os.environ.get("LATE_UPDATES", "staleness")  # drop | staleness
+STALENESS_DECAY = float(os.environ.get("STALENESS_DECAY", 0.5))
+MAX_STALENESS = int(os.environ.get("MAX_STALENESS", 2))
+
+# Per-round bytes on the wire and evaluation results
+ROUND_REPORT_PATH = os.environ.get("ROUND_REPORT_PATH", "Trained-Model/round_report.json")
 
 # Define model
 def get_model():
@@ -24,27 +69,311 @@ def get_model():
 
 # Define custom strategy
 class SaveModelStrategy(fl.server.strategy.FedAvg):
-    def aggregate_fit(self, rnd, results, failures):
-        aggregated = super().aggregate_fit(rnd, results, failures)
-        if aggregated is not None:
-            try:
-                parameters_aggregated, _ = aggregated
-                model = get_model()
-                weights = parameters_to_ndarrays(parameters_aggregated)
-                model.set_weights(weights)
-                os.makedirs('Trained-Model', exist_ok=True)
-                model.save(f'Trained-Model/global_model_round_{rnd}.h5')
-                print(f"✅ Model for round {rnd} saved successfully")
-
-                # Save final model at last round
-                if rnd == 10:
-                    model.save("Trained-Model/final_30_features_model.h5")
-                    print("🎯 Final model saved as final_30_features_model.h5")
+    def __init__(self, *args, num_rounds=NUM_ROUNDS, federated_scaler=False, checkpoints=None,
+                 scaler_path=SCALER_PATH, report_path=ROUND_REPORT_PATH, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_rounds = num_rounds
+        self.federated_scaler = federated_scaler
+        self.scaler_path = scaler_path
+        self.report_path = report_path
+        self.scaler_config = {}
+        self.checkpoints = checkpoints or CheckpointWriter(
+            CHECKPOINT_DIR, keep_last=CHECKPOINT_KEEP_LAST, final_path=FINAL_MODEL_PATH, build_model=get_model
+        )
+        self.round_weights = {}  # global weights sent out for fit, needed to decode compressed deltas
+        self.max_staleness = 0  # rounds of round_weights kept for updates that arrive late
+        self.round_report = {}
 
+    def initialize_parameters(self, client_manager):
+        if self.federated_scaler:
+            self.build_global_scaler(client_manager)
+        return super().initialize_parameters(client_manager)
+
+    def build_global_scaler(self, client_manager):
+        """Combine every connected client's (count, sum, sum of squares) into one saved scaler"""
+        client_manager.wait_for(self.min_available_clients)
+        ins = GetPropertiesIns(config={"request": "scaler_statistics"})
+        all_stats = []
+        for cid, client in client_manager.all().items():
+            try:
+                res = client.get_properties(ins, timeout=SCALER_STATS_TIMEOUT, group_id=None)
             except Exception as e:
-                print(f"❌ Error saving model: {str(e)}")
+                print(f"❌ Could not get scaler statistics from client {cid}: {str(e)}")
+                continue
+            if res.status.code != Code.OK or "count" not in res.properties:
+                print(f"❌ Client {cid} sent no scaler statistics")
+                continue
+            all_stats.append(decode_arrays(res.properties, STAT_KEYS))
+
+        if not all_stats:
+            print("❌ No scaler statistics received, clients will standardize with their own shards")
+            return
+        scaler = scaler_from_statistics(combine_statistics(all_stats))
+        os.makedirs(os.path.dirname(self.scaler_path) or ".", exist_ok=True)
+        joblib.dump(scaler, self.scaler_path)
+        self.scaler_config = encode_scaler(scaler)
+        print(f"✅ Global StandardScaler built from {len(all_stats)} clients "
+              f"({int(scaler.n_samples_seen_.max())} samples) and saved")
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        instructions = super().configure_fit(server_round, parameters, client_manager)
+        for _, fit_ins in instructions:
+            fit_ins.config.update(self.scaler_config)
+        self.round_weights[server_round] = parameters_to_ndarrays(parameters)
+        for rnd in [r for r in self.round_weights if r < server_round - self.max_staleness]:
+            del self.round_weights[rnd]
+        config = instructions[0][1].config if instructions else {}
+        self.round_report[server_round] = {
+            "compression": config.get("compression", "none"),
+            "topk": config.get("topk", 0.0),
+            "fit_clients": len(instructions),
+            "download_bytes": sum(len(t) for t in parameters.tensors) * len(instructions),
+        }
+        return instructions
+
+    def configure_evaluate(self, server_round, parameters, client_manager):
+        instructions = super().configure_evaluate(server_round, parameters, client_manager)
+        for _, evaluate_ins in instructions:
+            evaluate_ins.config.update(self.scaler_config)
+        return instructions
+
+    def decode_results(self, results, global_weights):
+        """FedAvg works on full weights: rebuild them from compressed deltas first"""
+        if global_weights is not None:
+            for _, fit_res in results:
+                arrays = parameters_to_ndarrays(fit_res.parameters)
+                if is_compressed(arrays, global_weights):
+                    fit_res.parameters = ndarrays_to_parameters(decode_update(arrays, global_weights))
+        return results
+
+    def record_uploads(self, rnd, results):
+        upload_bytes = sum(len(t) for _, fit_res in results for t in fit_res.parameters.tensors)
+        report = self.round_report.setdefault(rnd, {})
+        report["upload_bytes"] = report.get("upload_bytes", 0) + upload_bytes
+        report["uploads"] = report.get("uploads", 0) + len(results)
+        print(f"📦 Round {rnd}: {upload_bytes} bytes uploaded by {len(results)} clients, "
+              f"{report.get('download_bytes', 0)} bytes sent")
+
+    def aggregate_fit(self, rnd, results, failures):
+        self.record_uploads(rnd, results)
+        results = self.decode_results(results, self.round_weights.get(rnd))
+        return self.aggregate_and_checkpoint(rnd, results, failures)
+
+    def aggregate_and_checkpoint(self, rnd, results, failures):
+        aggregated = fl.server.strategy.FedAvg.aggregate_fit(self, rnd, results, failures)
+        if aggregated is not None and aggregated[0] is not None:
+            parameters_aggregated, _ = aggregated
+            # Written by the checkpoint thread; the next round does not wait for the disk
+            self.checkpoints.submit(rnd, parameters_to_ndarrays(parameters_aggregated), final=rnd == self.num_rounds)
+        return aggregated
+
+    def aggregate_evaluate(self, rnd, results, failures):
+        aggregated = super().aggregate_evaluate(rnd, results, failures)
+        if aggregated is not None and aggregated[0] is not None:
+            self.checkpoints.record_score(rnd, aggregated[0])
+            loss, metrics = aggregated
+            self.round_report.setdefault(rnd, {}).update({"loss": loss, **metrics})
+            self.write_round_report()
         return aggregated
 
+    def write_round_report(self):
+        if self.report_path is None:
+            return
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path, "w") as f:
+            json.dump({str(rnd): report for rnd, report in sorted(self.round_report.items())}, f, indent=2)
+
+class DeadlineStrategy(SaveModelStrategy):
+    """SaveModelStrategy for rounds that close at a deadline or quorum; run it with DeadlineServer.
+
+    Updates that miss their round reach aggregate_fit in a later round through
+    late_results. With late_updates="staleness" they are averaged in with their
+    weight scaled by staleness_decay ** staleness, up to max_staleness rounds
+    old; with "drop" (or when older) they are discarded.
+    """
+
+    def __init__(self, *args, deadline=None, quorum=1.0, late_updates="staleness", staleness_decay=0.5,
+                 max_staleness=2, **kwargs):
+        super().__init__(*args, **kwargs)
+        if late_updates not in ("drop", "staleness"):
+            raise ValueError(f"late_updates must be 'drop' or 'staleness', got {late_updates!r}")
+        self.deadline = deadline
+        self.quorum = quorum
+        self.late_updates = late_updates
+        self.staleness_decay = staleness_decay
+        self.max_staleness = max_staleness
+        self.late_results = []  # (client, fit_res, origin_round), filled in by DeadlineServer
+
+    def quorum_size(self, sampled):
+        return max(1, min(sampled, math.ceil(self.quorum * sampled)))
+
+    def aggregate_fit(self, rnd, results, failures):
+        self.record_uploads(rnd, results)
+        results = self.decode_results(results, self.round_weights.get(rnd))
+
+        late_applied, late_dropped = [], []
+        for client, fit_res, origin in self.late_results:
+            staleness = rnd - origin
+            origin_weights = self.round_weights.get(origin)
+            if self.late_updates == "drop" or staleness > self.max_staleness or origin_weights is None:
+                late_dropped.append(client.cid)
+                continue
+            self.record_uploads(rnd, [(client, fit_res)])
+            self.decode_results([(client, fit_res)], origin_weights)
+            fit_res.num_examples = max(1, round(fit_res.num_examples * self.staleness_decay ** staleness))
+            results = results + [(client, fit_res)]
+            late_applied.append(client.cid)
+        self.late_results = []
+
+        report = self.round_report.setdefault(rnd, {})
+        report["late_applied"] = late_applied
+        report["late_dropped"] = late_dropped
+        if not results:
+            return None, {}
+        return self.aggregate_and_checkpoint(rnd, results, failures)
+
+class DeadlineServer(fl.server.Server):
+    """Server whose fit rounds end at the DeadlineStrategy's deadline or quorum.
+
+    Clients that have not answered when the round closes keep training in the
+    background and are not sampled again until they finish; their updates are
+    handed to the strategy as late results in the round in which they arrive.
+    """
+
+    def __init__(self, *, client_manager, strategy):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+        self.executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="fit")
+        self.in_flight = {}  # cid -> (origin_round, client, future)
+        self.pending_late = []  # late results collected in a round that had nothing to aggregate
+
+    def fit_round(self, server_round, timeout):
+        if self.in_flight and len(self.in_flight) >= self._client_manager.num_available():
+            # Every client is still busy with an earlier round: give one the chance to finish first
+            concurrent.futures.wait([future for _, _, future in self.in_flight.values()],
+                                    timeout=self.strategy.deadline, return_when=concurrent.futures.FIRST_COMPLETED)
+        late_results, late_failures = self.collect_late(server_round)
+
+        instructions = self.strategy.configure_fit(
+            server_round=server_round, parameters=self.parameters, client_manager=self._client_manager
+        )
+        busy = [client.cid for client, _ in instructions if client.cid in self.in_flight]
+        instructions = [(client, ins) for client, ins in instructions if client.cid not in self.in_flight]
+        if not instructions:
+            # Keep what has arrived for the next round that does aggregate
+            self.pending_late = late_results
+            self.strategy.round_report.setdefault(server_round, {}).update({
+                "closed_by": "no_idle_clients", "busy_skipped": busy, "fit_clients": 0, "download_bytes": 0,
+            })
+            print(f"❌ Round {server_round}: no idle clients sampled, skipping fit")
+            return None
+
+        quorum = self.strategy.quorum_size(len(instructions))
+        started = time.monotonic()
+        pending = set()
+        for client, ins in instructions:
+            future = self.executor.submit(client.fit, ins, timeout, server_round)
+            self.in_flight[client.cid] = (server_round, client, future)
+            pending.add(future)
+
+        results, failures = [], []
+        closed_by = "all"
+        while pending:
+            remaining = None
+            if self.strategy.deadline:
+                remaining = self.strategy.deadline - (time.monotonic() - started)
+                if remaining <= 0:
+                    closed_by = "deadline"
+                    break
+            done, pending = concurrent.futures.wait(
+                pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for cid in [cid for cid, (rnd, _, future) in self.in_flight.items() if rnd == server_round and future in done]:
+                _, client, future = self.in_flight.pop(cid)
+                self.collect(client, future, results, failures)
+            if pending and len(results) >= quorum:
+                closed_by = "quorum"
+                break
+
+        # Stragglers from earlier rounds that have finished since
+        more_results, more_failures = self.collect_late(server_round)
+        self.strategy.late_results = late_results + more_results
+        failures.extend(late_failures + more_failures)
+
+        still_running = sorted(self.in_flight)  # dispatched in this or an earlier round
+        self.strategy.round_report.setdefault(server_round, {}).update({
+            "closed_by": closed_by,
+            "fit_round_seconds": time.monotonic() - started,
+            "quorum": quorum,
+            "busy_skipped": busy,
+            "fit_clients": len(instructions),
+            "download_bytes": sum(len(t) for _, ins in instructions for t in ins.parameters.tensors),
+            "on_time": len(results),
+            "still_running": still_running,
+            "failures": len(failures),
+        })
+        aggregated = self.strategy.aggregate_fit(server_round, results, failures)
+        report = self.strategy.round_report[server_round]
+        print(f"⏱️ Round {server_round} closed by {closed_by} after {report['fit_round_seconds']:.2f}s: "
+              f"{len(results)} on time, {len(still_running)} still running, "
+              f"{len(report.get('late_applied', []))} late applied, {len(report.get('late_dropped', []))} late dropped")
+
+        parameters_aggregated, metrics_aggregated = aggregated
+        return parameters_aggregated, metrics_aggregated, (results, failures)
+
+    def evaluate_round(self, server_round, timeout):
+        # A client still training would only answer after its fit, stalling evaluation like a straggler
+        instructions = self.strategy.configure_evaluate(
+            server_round=server_round, parameters=self.parameters, client_manager=self._client_manager
+        )
+        instructions = [(client, ins) for client, ins in instructions if client.cid not in self.in_flight]
+        if not instructions:
+            return None
+        results, failures = evaluate_clients(
+            instructions, max_workers=self.max_workers, timeout=timeout, group_id=server_round
+        )
+        loss_aggregated, metrics_aggregated = self.strategy.aggregate_evaluate(server_round, results, failures)
+        return loss_aggregated, metrics_aggregated, (results, failures)
+
+    def collect_late(self, server_round):
+        """(client, fit_res, origin_round) of finished updates from earlier rounds, and their failures"""
+        late_results, failures = self.pending_late, []
+        self.pending_late = []
+        for cid in [cid for cid, (rnd, _, future) in self.in_flight.items() if rnd < server_round and future.done()]:
+            origin, client, future = self.in_flight.pop(cid)
+            results = []
+            self.collect(client, future, results, failures)
+            late_results.extend((client, fit_res, origin) for client, fit_res in results)
+        return late_results, failures
+
+    @staticmethod
+    def collect(client, future, results, failures):
+        try:
+            fit_res = future.result()
+        except Exception as e:
+            failures.append(e)
+            return
+        if fit_res.status.code == Code.OK:
+            results.append((client, fit_res))
+        else:
+            failures.append((client, fit_res))
+
+    def disconnect_all_clients(self, timeout):
+        # Updates still in flight can no longer be aggregated
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        super().disconnect_all_clients(timeout)
+
+# Per-round client training config
+def fit_config(server_round):
+    return {
+        "server_round": server_round,
+        "epochs": FIT_EPOCHS,
+        "batch_size": FIT_BATCH_SIZE,
+        "shuffle_buffer": FIT_SHUFFLE_BUFFER,
+        "validation_split": FIT_VALIDATION_SPLIT,
+        "compression": COMPRESSION,
+        "topk": COMPRESSION_TOPK,
+    }
+
 # Define weighted average metrics
 def weighted_average(metrics):
     if not metrics:
@@ -63,21 +392,50 @@ def weighted_average(metrics):
 
     return metrics_aggregated
 
-# Start FL server with custom strategy
-strategy = SaveModelStrategy(
-    fraction_fit=0.5,
-    fraction_evaluate=0.5,
-    min_fit_clients=2,
-    min_evaluate_clients=2,
-    min_available_clients=2,
-    fit_metrics_aggregation_fn=weighted_average,
-    evaluate_metrics_aggregation_fn=weighted_average,
-)
-
-fl.server.start_server(
-    server_address="0.0.0.0:8080",
-    config=fl.server.ServerConfig(num_rounds=10),
-    strategy=strategy
-)
-
-print("✅ Server stopped.")
+def main():
+    # Start FL server with custom strategy
+    strategy_kwargs = dict(
+        fraction_fit=0.5,
+        fraction_evaluate=0.5,
+        min_fit_clients=2,
+        min_evaluate_clients=2,
+        min_available_clients=2,
+        fit_metrics_aggregation_fn=weighted_average,
+        evaluate_metrics_aggregation_fn=weighted_average,
+        on_fit_config_fn=fit_config,
+        num_rounds=NUM_ROUNDS,
+        federated_scaler=FEDERATED_SCALER,
+    )
+    client_manager = fl.server.SimpleClientManager()
+    if ROUND_DEADLINE > 0 or ROUND_QUORUM < 1.0:
+        strategy = DeadlineStrategy(
+            **strategy_kwargs,
+            deadline=ROUND_DEADLINE or None,
+            quorum=ROUND_QUORUM,
+            late_updates=LATE_UPDATES,
+            staleness_decay=STALENESS_DECAY,
+            max_staleness=MAX_STALENESS,
+        )
+        server = DeadlineServer(client_manager=client_manager, strategy=strategy)
+    else:
+        strategy = SaveModelStrategy(**strategy_kwargs)
+        server = fl.server.Server(client_manager=client_manager, strategy=strategy)
+
+    completed = False
+    try:
+        fl.server.start_server(
+            server_address="0.0.0.0:8080",
+            server=server,
+            config=fl.server.ServerConfig(num_rounds=NUM_ROUNDS),
+        )
+        completed = True
+    finally:
+        # Let queued checkpoints finish writing. Only a run that finished all its rounds
+        # writes the final model from the latest checkpoint when the last round had
+        # nothing to aggregate
+        strategy.checkpoints.close(completed=completed)
+
+    print("✅ Server stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# simulation.py
+"""Single-command federated run: SaveModelStrategy plus N PhishingClients on one machine.
+
+Flower's own Server loop drives the clients through in-process ClientProxy
+objects (one thread per client, no gRPC, no port), so the strategy, the
+client code and the parameter serialization are the real ones. Clients run
+in FEDERATED_SCALER mode and every artifact (checkpoints, final model,
+scaler) goes to --output-dir, never to Trained-Model/.
+
+Reports per-round wall time, per-client fit/evaluate time, bytes transferred
+and accuracy as JSON, to --output or else to stdout; progress and the per-round
+summary go to stderr, so stdout can be piped straight into jq:
+
+    python simulation.py --clients 4 --rounds 3 --epochs 1 --batch-size 64 --output sim.json
+    python simulation.py --clients 2 --rounds 2 | jq .final
+
+--deadline/--quorum switch to DeadlineStrategy + DeadlineServer; --straggler-delay
+makes client 0 that much slower per fit, to see how rounds behave around it.
+"""
+import argparse
+import contextlib
+import json
+import math
+import tempfile
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import flwr as fl
+from flwr.common import DisconnectRes
+from flwr.server.client_proxy import ClientProxy
+
+from checkpointing import CheckpointWriter
+from client import PhishingClient
+from federated_scaler import shard_statistics
+from server import DeadlineServer, DeadlineStrategy, SaveModelStrategy, fit_config, get_model, weighted_average
+
+
+class Timings:
+    """Thread-safe (kind, round) -> {cid: seconds}"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = {}
+
+    def record(self, kind, rnd, cid, seconds):
+        with self._lock:
+            self.seconds.setdefault((kind, rnd), {})[cid] = seconds
+
+    def get(self, kind, rnd):
+        with self._lock:
+            return dict(self.seconds.get((kind, rnd), {}))
+
+
+class InProcessClientProxy(ClientProxy):
+    """ClientProxy calling a PhishingClient directly; group_id is the server round"""
+
+    def __init__(self, cid, numpy_client, timings, delay=0.0):
+        super().__init__(cid)
+        self.client = numpy_client.to_client()
+        self.timings = timings
+        self.delay = delay
+
+    def get_properties(self, ins, timeout, group_id):
+        return self.client.get_properties(ins)
+
+    def get_parameters(self, ins, timeout, group_id):
+        return self.client.get_parameters(ins)
+
+    def fit(self, ins, timeout, group_id):
+        started = time.perf_counter()
+        if self.delay:
+            time.sleep(self.delay)
+        res = self.client.fit(ins)
+        self.timings.record("fit", group_id, self.cid, time.perf_counter() - started)
+        return res
+
+    def evaluate(self, ins, timeout, group_id):
+        started = time.perf_counter()
+        res = self.client.evaluate(ins)
+        self.timings.record("evaluate", group_id, self.cid, time.perf_counter() - started)
+        return res
+
+    def reconnect(self, ins, timeout, group_id):
+        return DisconnectRes(reason="")
+
+
+class RoundTimer:
+    """Strategy mixin recording when each round starts and finishes"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_started = {}
+        self.round_finished = {}
+
+    def configure_fit(self, server_round, parameters, client_manager):
+        self.round_started[server_round] = time.perf_counter()
+        return super().configure_fit(server_round, parameters, client_manager)
+
+    def aggregate_fit(self, rnd, results, failures):
+        aggregated = super().aggregate_fit(rnd, results, failures)
+        self.round_finished[rnd] = time.perf_counter()
+        return aggregated
+
+    def aggregate_evaluate(self, rnd, results, failures):
+        aggregated = super().aggregate_evaluate(rnd, results, failures)
+        self.round_finished[rnd] = time.perf_counter()
+        return aggregated
+
+
+class TimedStrategy(RoundTimer, SaveModelStrategy):
+    pass
+
+
+class TimedDeadlineStrategy(RoundTimer, DeadlineStrategy):
+    pass
+
+
+def resize_partition(client, rows):
+    """Truncate or tile a client's (unscaled) partition to `rows` rows, keeping the 80/20 split"""
+    train_rows = int(rows * 0.8)
+    test_rows = rows - train_rows
+    client.X_train = np.resize(client.X_train, (train_rows, client.X_train.shape[1]))
+    client.y_train = np.resize(client.y_train, train_rows)
+    client.X_test = np.resize(client.X_test, (test_rows, client.X_test.shape[1]))
+    client.y_test = np.resize(client.y_test, test_rows)
+    client.scaler_statistics = shard_statistics(np.vstack([client.X_train, client.X_test]))
+
+
+def run_simulation(clients=2, rounds=3, fraction_fit=1.0, fraction_evaluate=1.0, rows_per_client=None,
+                   max_workers=None, output_dir=None, fit_overrides=None, deadline=None, quorum=1.0,
+                   late_updates="staleness", straggler_delay=0.0):
+    """Run a full federation in-process and return the per-round report"""
+    output_dir = output_dir or tempfile.mkdtemp(prefix="phishing-simulation-")
+    fit_overrides = {key: value for key, value in (fit_overrides or {}).items() if value is not None}
+    timings = Timings()
+
+    started = time.perf_counter()
+    client_manager = fl.server.SimpleClientManager()
+    for cid in range(clients):
+        client = PhishingClient(cid, clients, federated_scaler=True)
+        if rows_per_client:
+            resize_partition(client, rows_per_client)
+        delay = straggler_delay if cid == 0 else 0.0
+        client_manager.register(InProcessClientProxy(str(cid), client, timings, delay=delay))
+    startup_seconds = time.perf_counter() - started
+
+    deadline_mode = bool(deadline) or quorum < 1.0
+    strategy_kwargs = {"deadline": deadline, "quorum": quorum, "late_updates": late_updates} if deadline_mode else {}
+    strategy = (TimedDeadlineStrategy if deadline_mode else TimedStrategy)(
+        **strategy_kwargs,
+        fraction_fit=fraction_fit,
+        fraction_evaluate=fraction_evaluate,
+        min_fit_clients=max(1, math.ceil(fraction_fit * clients)),
+        min_evaluate_clients=max(1, math.ceil(fraction_evaluate * clients)),
+        min_available_clients=clients,
+        fit_metrics_aggregation_fn=weighted_average,
+        evaluate_metrics_aggregation_fn=weighted_average,
+        on_fit_config_fn=lambda server_round: {**fit_config(server_round), **fit_overrides},
+        num_rounds=rounds,
+        federated_scaler=True,
+        checkpoints=CheckpointWriter(os.path.join(output_dir, "checkpoints"),
+                                     final_path=os.path.join(output_dir, "final_30_features_model.h5"),
+                                     build_model=get_model),
+        scaler_path=os.path.join(output_dir, "standard_scaler.pkl"),
+        report_path=None,
+    )
+    if deadline_mode:
+        server = DeadlineServer(client_manager=client_manager, strategy=strategy)
+    else:
+        server = fl.server.Server(client_manager=client_manager, strategy=strategy)
+        server.set_max_workers(max_workers)
+
+    _, total_seconds = server.fit(num_rounds=rounds, timeout=None)
+    if deadline_mode:
+        server.executor.shutdown(wait=False, cancel_futures=True)
+    strategy.checkpoints.close(completed=True)
+
+    round_reports = []
+    for rnd in range(1, rounds + 1):
+        report = dict(strategy.round_report.get(rnd, {}))
+        if rnd in strategy.round_started and rnd in strategy.round_finished:
+            report["wall_seconds"] = strategy.round_finished[rnd] - strategy.round_started[rnd]
+        report["fit_seconds"] = timings.get("fit", rnd)
+        report["evaluate_seconds"] = timings.get("evaluate", rnd)
+        round_reports.append({"round": rnd, **report})
+
+    last = round_reports[-1] if round_reports else {}
+    return {
+        "config": {
+            "clients": clients,
+            "rounds": rounds,
+            "fraction_fit": fraction_fit,
+            "fraction_evaluate": fraction_evaluate,
+            "rows_per_client": rows_per_client,
+            "max_workers": max_workers,
+            "deadline": deadline,
+            "quorum": quorum,
+            "late_updates": late_updates if deadline_mode else None,
+            "straggler_delay": straggler_delay,
+            "fit_config": {**fit_config(1), **fit_overrides},
+        },
+        "output_dir": output_dir,
+        "startup_seconds": startup_seconds,
+        "total_seconds": total_seconds,
+        "rounds": round_reports,
+        "final": {"loss": last.get("loss"), "accuracy": last.get("accuracy")},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SaveModelStrategy and N PhishingClients in one process")
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--fraction-fit", type=float, default=1.0)
+    parser.add_argument("--fraction-evaluate", type=float, default=1.0)
+    parser.add_argument("--rows-per-client", type=int, default=None,
+                        help="truncate or tile every partition to this many rows")
+    parser.add_argument("--max-workers", type=int, default=None, help="clients trained concurrently")
+    parser.add_argument("--epochs", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--compression", choices=["none", "float16", "int8"], default=None)
+    parser.add_argument("--topk", type=float, default=None)
+    parser.add_argument("--deadline", type=float, default=None, help="seconds after which a fit round closes")
+    parser.add_argument("--quorum", type=float, default=1.0, help="fraction of sampled clients that closes a round")
+    parser.add_argument("--late-updates", choices=["drop", "staleness"], default="staleness")
+    parser.add_argument("--straggler-delay", type=float, default=0.0, help="extra seconds per fit for client 0")
+    parser.add_argument("--output-dir", default=None, help="checkpoints/final model (default: a temp dir)")
+    parser.add_argument("--output", default=None, help="JSON report path (default: stdout)")
+    args = parser.parse_args()
+
+    # Client/strategy progress prints would otherwise end up in front of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run_simulation(
+            clients=args.clients,
+            rounds=args.rounds,
+            fraction_fit=args.fraction_fit,
+            fraction_evaluate=args.fraction_evaluate,
+            rows_per_client=args.rows_per_client,
+            max_workers=args.max_workers,
+            output_dir=args.output_dir,
+            fit_overrides={"epochs": args.epochs, "batch_size": args.batch_size,
+                           "compression": args.compression, "topk": args.topk},
+            deadline=args.deadline,
+            quorum=args.quorum,
+            late_updates=args.late_updates,
+            straggler_delay=args.straggler_delay,
+        )
+
+    for report in results["rounds"]:
+        fit_times = list(report["fit_seconds"].values())
+        print(f"Round {report['round']}: {report.get('wall_seconds', float('nan')):.2f}s wall, "
+              f"slowest fit {max(fit_times, default=0.0):.2f}s, "
+              f"{report.get('upload_bytes', 0)} B up / {report.get('download_bytes', 0)} B down, "
+              f"accuracy {report.get('accuracy', float('nan')):.4f}"
+              + (f", closed by {report['closed_by']}, still running {report.get('still_running', [])}, "
+                 f"late applied {report.get('late_applied', [])}, late dropped {report.get('late_dropped', [])}"
+                 if "closed_by" in report else ""), file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        print(f"✅ Simulation report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,46 @@ import numpy as np
 import pickle
 import os
 import sys
-sys.path.append(os.path.abspath("ml-model/Data-Processing-Script"))
-from featureExtractor import featureExtraction
+from artifacts import registry, track_first_request  # also puts Data-Processing-Script on sys.path
+import featureExtractor
+from featureExtractor import buildFeatureRow, buildFeatureValues, concurrentLookups
+from prediction_cache import cache_from_env
+from serving_metrics import ServingMetrics, install_metrics
 
-from pycaret.classification import load_model, predict_model
+# Load the PyCaret pipeline and the PCA model once, with a warmup inference each
+model = registry.warmup('phishingdetection')
+registry.warmup('pca')
 
-model = load_model('ml-model/Trained-Model/phishingdetection')    
+# NumPy replay of the same pipeline (compiled_pipeline.py), skipping the per-request DataFrames.
+# PYCARET_FAST_PATH=0, or a pipeline step it cannot replay, falls back to model.predict.
+compiled_model = None
+if os.environ.get('PYCARET_FAST_PATH', '1') != '0':
+    try:
+        compiled_model = registry.warmup('phishingdetection_compiled')
+        print('✅ Compiled fast path enabled for the PyCaret pipeline')
+    except ValueError as e:
+        print('❌ Compiled fast path unavailable, using model.predict:', e)
+registry.mark_ready()
+print('Startup:', registry.report())
     
 app = Flask(__name__, static_folder='frontend', template_folder='frontend')
+track_first_request(app, registry)
+
+# Request counts and per-stage latency histograms, served at /metrics.
+# whois / http_fetch are timed inside featureExtractor, including lookups that overrun their deadline.
+metrics = install_metrics(app, ServingMetrics())
+
+def observe_lookup(stage, seconds, failed):
+    metrics.observe(stage, seconds)
+    if failed:
+        metrics.record_error('/prediction', stage)
+
+featureExtractor.stageObserver = observe_lookup
+
+# LRU + TTL cache of responses keyed by the exact URL; spares the whois/HTTP lookups on repeats
+prediction_cache = cache_from_env('PREDICTION_CACHE')
+# A result computed with a failed or timed-out whois/page lookup is kept only this long (seconds)
+FALLBACK_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_FALLBACK_TTL', 60))
 
 @app.route('/')
 def index():
@@ -29,15 +61,43 @@ def predict():
     if not url:
         return jsonify({'error': 'No URL provided'}), 400
 
-    # Extract features
-    features = featureExtraction(url)  # should return correctly shaped data
+    if prediction_cache is not None:
+        cached = prediction_cache.get(url)
+        if cached is not None:
+            return jsonify(cached)
 
-    # Predict directly
-    prediction = model.predict(features)[0]  
+    # Extract features; whois + page fetch run concurrently, with deadlines
+    with metrics.stage('extraction'):
+        dns, domain_name, page = concurrentLookups(url)
+        if compiled_model is not None:
+            features = buildFeatureValues(url, dns, domain_name, page)
+        else:
+            features = buildFeatureRow(url, dns, domain_name, page)
+    lookups_failed = dns == 1 or page == ''
+
+    if compiled_model is not None:
+        with metrics.stage('inference'):
+            prediction = compiled_model.predict(np.array([features], dtype=float))[0]
+    else:
+        # Predict directly (the PyCaret pipeline does its own preprocessing)
+        with metrics.stage('inference'):
+            prediction = model.predict(features)[0]
 
     result = 'Phishing' if prediction == 1 else 'Legitimate'
 
-    return jsonify({'result': result})
+    response = {'result': result}
+    if prediction_cache is not None:
+        prediction_cache.put(url, response, ttl=FALLBACK_CACHE_TTL if lookups_failed else None)
+    with metrics.stage('serialization'):
+        return jsonify(response)
+
+
+@app.route('/prediction/stats', methods=['GET'])
+def prediction_stats():
+    return jsonify({
+        'cache': prediction_cache.stats() if prediction_cache is not None else None,
+        'startup': registry.report(),
+    })
 
 
 # Serve static files like CSS and JS
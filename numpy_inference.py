@@ -0,0 +1,179 @@
+"""TensorFlow-free inference for the 30-feature phishing MLP.
+
+Reads the Dense kernels/biases straight out of the Keras .h5 file, folds the
+StandardScaler into the first layer and runs the forward pass as NumPy matmuls.
+Only h5py and NumPy are needed at serving time.
+
+The folded layers can be exported as plain .npy files and loaded back as
+read-only memory maps, so every worker process of serve.py shares one copy of
+the weights through the page cache.
+"""
+import json
+import os
+import sys
+import tempfile
+
+import h5py
+import numpy as np
+
+
+ACTIVATIONS = {
+    "linear": lambda z: z,
+    # TF's relu maps NaN to 0 (np.maximum would propagate it); match it for parity
+    "relu": lambda z: np.where(z > 0.0, z, 0.0),
+    "tanh": np.tanh,
+    "sigmoid": lambda z: 1.0 / (1.0 + np.exp(-np.clip(z, -500.0, 500.0))),
+}
+
+# Layers that are identity at inference time
+PASSTHROUGH_LAYERS = {"InputLayer", "Dropout"}
+
+# Index of an exported model: activations plus the files it was built from
+EXPORT_INDEX = "layers.json"
+
+
+class NumpyMLP:
+    """Stack of Dense layers evaluated with NumPy; mirrors get_model()/create_phishing_model()"""
+
+    def __init__(self, layers):
+        # layers: list of (kernel, bias, activation_name)
+        self.layers = layers
+
+    @classmethod
+    def load(cls, model_path, scaler=None):
+        """Load Dense weights from a Keras .h5 model, optionally folding in a fitted StandardScaler"""
+        layers = []
+        with h5py.File(model_path, "r") as f:
+            config = f.attrs["model_config"]
+            if isinstance(config, bytes):
+                config = config.decode("utf-8")
+            weights = f["model_weights"]
+
+            for layer in json.loads(config)["config"]["layers"]:
+                class_name = layer["class_name"]
+                if class_name in PASSTHROUGH_LAYERS:
+                    continue
+                if class_name != "Dense":
+                    raise ValueError(f"Unsupported layer type for NumPy backend: {class_name}")
+
+                name = layer["config"]["name"]
+                activation = layer["config"].get("activation", "linear")
+                if activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation for NumPy backend: {activation}")
+
+                group = weights[name]
+                kernel_name, bias_name = [n.decode("utf-8") if isinstance(n, bytes) else n
+                                          for n in group.attrs["weight_names"]]
+                kernel = np.asarray(group[kernel_name], dtype=np.float64)
+                bias = np.asarray(group[bias_name], dtype=np.float64)
+                layers.append((kernel, bias, activation))
+
+        if not layers:
+            raise ValueError(f"No Dense layers found in {model_path}")
+
+        if scaler is not None:
+            layers[0] = fold_scaler(layers[0], scaler)
+        return cls(layers)
+
+    def save(self, directory, sources=()):
+        """Export the layers as .npy files; `sources` (e.g. the .h5 and scaler) are recorded for export_is_current"""
+        os.makedirs(directory, exist_ok=True)
+        for i, (kernel, bias, _) in enumerate(self.layers):
+            _atomic_save(os.path.join(directory, f"kernel_{i}.npy"), kernel)
+            _atomic_save(os.path.join(directory, f"bias_{i}.npy"), bias)
+        index = {
+            "activations": [activation for _, _, activation in self.layers],
+            "sources": {os.path.abspath(path): _file_signature(path) for path in sources},
+        }
+        # Written last, so a reader never sees an index pointing at missing arrays
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, os.path.join(directory, EXPORT_INDEX))
+
+    @classmethod
+    def load_arrays(cls, directory, mmap=True):
+        """Layers exported by save(); with mmap the weights are read-only memory maps"""
+        with open(os.path.join(directory, EXPORT_INDEX)) as f:
+            activations = json.load(f)["activations"]
+        mode = "r" if mmap else None
+        return cls([(np.load(os.path.join(directory, f"kernel_{i}.npy"), mmap_mode=mode),
+                     np.load(os.path.join(directory, f"bias_{i}.npy"), mmap_mode=mode),
+                     activation)
+                    for i, activation in enumerate(activations)])
+
+    @staticmethod
+    def export_is_current(directory, sources):
+        """True if `directory` holds an export built from exactly these versions of `sources`"""
+        try:
+            with open(os.path.join(directory, EXPORT_INDEX)) as f:
+                recorded = json.load(f)["sources"]
+        except (OSError, ValueError, KeyError):
+            return False
+        return recorded == {os.path.abspath(path): _file_signature(path) for path in sources}
+
+    def predict(self, features_array):
+        """Return an (N, 1) array of probabilities, same shape as keras Model.predict"""
+        x = np.asarray(features_array, dtype=np.float64)
+        for kernel, bias, activation in self.layers:
+            x = ACTIVATIONS[activation](x @ kernel + bias)
+        return x
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _atomic_save(path, array):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".npy")
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp_path, path)
+
+
+def fold_scaler(layer, scaler):
+    """Rewrite the first Dense layer so it takes unscaled features.
+
+    (x - mean) / scale @ W + b == x @ (W / scale[:, None]) + (b - (mean / scale) @ W)
+    """
+    kernel, bias, activation = layer
+    mean = scaler.mean_ if getattr(scaler, "with_mean", True) and scaler.mean_ is not None else 0.0
+    scale = scaler.scale_ if getattr(scaler, "with_std", True) and scaler.scale_ is not None else 1.0
+    mean = np.broadcast_to(np.asarray(mean, dtype=np.float64), (kernel.shape[0],))
+    scale = np.broadcast_to(np.asarray(scale, dtype=np.float64), (kernel.shape[0],))
+
+    folded_kernel = kernel / scale[:, None]
+    folded_bias = bias - (mean / scale) @ kernel
+    return folded_kernel, folded_bias, activation
+
+
+if __name__ == "__main__":
+    # Parity check against Keras on the processed training data:
+    #   python numpy_inference.py [model.h5] [scaler.pkl] [processed.csv]
+    import joblib
+    import pandas as pd
+    import tensorflow as tf
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "ml-model/Trained-Model/final_30_features_model.h5"
+    scaler_path = sys.argv[2] if len(sys.argv) > 2 else "ml-model/Trained-Model/standard_scaler.pkl"
+    data_path = sys.argv[3] if len(sys.argv) > 3 else "ml-model/Processed-Data/processed_training_dataset_30.csv"
+
+    scaler = joblib.load(scaler_path)
+    X = pd.read_csv(data_path).iloc[:, :-1].values.astype(float)
+
+    keras_probs = tf.keras.models.load_model(model_path).predict(scaler.transform(X), verbose=0)[:, 0]
+    numpy_probs = NumpyMLP.load(model_path, scaler=scaler).predict(X)[:, 0]
+
+    # NaN outputs (e.g. from NaN weights reaching the sigmoid) must line up exactly
+    nan_mismatches = int(np.sum(np.isnan(keras_probs) != np.isnan(numpy_probs)))
+    finite = ~(np.isnan(keras_probs) | np.isnan(numpy_probs))
+    max_abs_diff = float(np.max(np.abs(keras_probs[finite] - numpy_probs[finite]), initial=0.0))
+    label_mismatches = int(np.sum((keras_probs >= 0.5) != (numpy_probs >= 0.5)))
+    print(f"Rows: {len(X)}  max |keras - numpy|: {max_abs_diff:.3e}  "
+          f"label mismatches: {label_mismatches}  NaN mismatches: {nan_mismatches}")
+
+    if max_abs_diff > 1e-5 or label_mismatches or nan_mismatches:
+        print("❌ NumPy backend does not match Keras")
+        sys.exit(1)
+    print("✅ NumPy backend matches Keras")
@@ -0,0 +1,132 @@
+"""Bounded LRU + TTL cache for URL predictions, shared by both Flask servers.
+
+Entries are keyed on the exact URL as sent. Every normalization tried (host
+case, default port, trailing slash) changes some lexical feature, so two
+spellings of a URL can legitimately score differently and must not share an
+entry. canonicalize_url is kept for lookups that do not depend on the
+features (reputation_index.py).
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url):
+    """Normalized URL: lower-cased scheme/host, default port dropped, trailing slash normalized"""
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+
+    netloc = host
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{host}:{port}"
+    if "@" in parts.netloc:
+        netloc = parts.netloc.rsplit("@", 1)[0] + "@" + netloc
+
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, netloc, path, parts.query, parts.fragment))
+
+
+def _approx_size(obj):
+    """Rough in-memory size of a cached key/value (strings, numbers and flat dicts)"""
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_approx_size(k) + _approx_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_approx_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry TTL, bounded by entry count and approximate bytes"""
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, ttl=3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, url):
+        key = url
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, url, value, ttl=None):
+        """Cache `value` for `ttl` seconds (default: the cache's TTL)"""
+        key = url
+        size = _approx_size(key) + _approx_size(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def cache_from_env(prefix="PREDICT_CACHE"):
+    """Build a PredictionCache from <prefix>_MAX_ENTRIES/_MAX_BYTES/_TTL, or None if <prefix>=0"""
+    if os.environ.get(prefix, "1") == "0":
+        return None
+    return PredictionCache(
+        max_entries=int(os.environ.get(f"{prefix}_MAX_ENTRIES", 10000)),
+        max_bytes=int(os.environ.get(f"{prefix}_MAX_BYTES", 16 * 1024 * 1024)),
+        ttl=float(os.environ.get(f"{prefix}_TTL", 3600)),
+    )
@@ -0,0 +1,330 @@
+"""Known-URL / known-host reputation index, consulted by server_api.py before feature extraction.
+
+Sources are labelled datasets (CSV with a url and a status column holding
+"phishing" / "legitimate", like Training-Dataset/training_dataset_1.csv) and
+operator allow / deny lists (one URL or host per line, '#' comments). Each key
+is stored as a 64-bit hash in a sorted uint64 array per table:
+
+    deny_url, deny_host       operator deny list   -> Phishing
+    allow_url, allow_host     operator allow list  -> Legitimate
+    phishing_url, legitimate_url
+                              dataset labels (exact URL only; a phishing page
+                              on a shared host says nothing about the host)
+
+A host entry also matches its subdomains. A Bloom filter over all keys answers
+"not in any table" without touching the tables, which is the common case.
+
+The tables and the filter are plain .npy files loaded as read-only memory maps,
+so serve.py's workers share one copy. Every source is parsed into its own part
+file; a rebuild only re-reads the sources whose size or mtime changed and then
+merges the parts.
+"""
+import csv
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from bisect import bisect_left
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from prediction_cache import canonicalize_url
+
+# Index of a built directory: tables, Bloom parameters and the source files it was built from
+INDEX_FILE = "index.json"
+PARTS_DIR = "parts"
+
+DATASET, ALLOW, DENY = "dataset", "allow", "deny"
+SOURCE_TABLES = {
+    DATASET: ("phishing_url", "legitimate_url"),
+    ALLOW: ("allow_url", "allow_host"),
+    DENY: ("deny_url", "deny_host"),
+}
+TABLES = SOURCE_TABLES[DENY] + SOURCE_TABLES[ALLOW] + SOURCE_TABLES[DATASET]
+
+# Lookup order: the operator's lists override the datasets, and an exact URL overrides its host
+RULES = (
+    ("deny_url", DENY, "url", "Phishing"),
+    ("allow_url", ALLOW, "url", "Legitimate"),
+    ("deny_host", DENY, "host", "Phishing"),
+    ("allow_host", ALLOW, "host", "Legitimate"),
+    ("phishing_url", DATASET, "url", "Phishing"),
+    ("legitimate_url", DATASET, "url", "Legitimate"),
+)
+
+# About 1% false positives
+BLOOM_BITS_PER_KEY = 10
+BLOOM_HASHES = 7
+
+
+def url_key(url):
+    return _hash("u " + canonicalize_url(url))
+
+
+def host_keys(url):
+    """Hashes of the URL's host and of its parent domains (a.b.example.com, b.example.com, example.com)"""
+    url = url.strip()
+    try:
+        host = urlsplit(url if "://" in url else "http://" + url).hostname or ""
+    except ValueError:
+        return []
+    labels = host.rstrip(".").split(".")
+    if len(labels) < 2 or host.replace(".", "").isdigit():
+        return [_hash("h " + host)] if host else []
+    return [_hash("h " + ".".join(labels[i:])) for i in range(len(labels) - 1)]
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=8).digest(), "little")
+
+
+def _bloom_positions(keys, bits, hashes):
+    """(len(keys), hashes) bit positions by double hashing the two 32-bit halves of each key"""
+    keys = np.asarray(keys, dtype=np.uint64)
+    low = keys & np.uint64(0xFFFFFFFF)
+    high = (keys >> np.uint64(32)) | np.uint64(1)
+    steps = np.arange(hashes, dtype=np.uint64)
+    return (low[:, None] + steps[None, :] * high[:, None]) % np.uint64(bits)
+
+
+def read_dataset(path, url_column="url", label_column="status"):
+    phishing, legitimate = [], []
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        for row in csv.DictReader(f):
+            url = (row.get(url_column) or "").strip()
+            label = (row.get(label_column) or "").strip().lower()
+            if not url:
+                continue
+            if label in ("phishing", "1"):
+                phishing.append(url_key(url))
+            elif label in ("legitimate", "0"):
+                legitimate.append(url_key(url))
+    return {"phishing_url": phishing, "legitimate_url": legitimate}
+
+
+def read_list(path, kind):
+    """Operator list: an entry with a scheme or a path is a URL, anything else a host"""
+    urls, hosts = [], []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            entry = line.split("#", 1)[0].strip()
+            if not entry:
+                continue
+            if "://" in entry or "/" in entry:
+                urls.append(url_key(entry))
+            else:
+                hosts.append(_hash("h " + entry.lower().rstrip(".")))
+    url_table, host_table = SOURCE_TABLES[kind]
+    return {url_table: urls, host_table: hosts}
+
+
+def _read_source(kind, path):
+    tables = read_dataset(path) if kind == DATASET else read_list(path, kind)
+    return {name: np.unique(np.asarray(keys, dtype=np.uint64)) for name, keys in tables.items()}
+
+
+def _source_id(kind, path):
+    return f"{kind}:{os.path.abspath(path)}"
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _atomic_write(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class ReputationIndex:
+    """Sorted uint64 hash tables plus a Bloom filter; lookup(url) -> (label, source, match) or None"""
+
+    def __init__(self, tables, bloom, bloom_hashes=BLOOM_HASHES):
+        self.tables = tables
+        self.bloom = bloom
+        self.bloom_bits = len(bloom) * 8
+        self.bloom_hashes = bloom_hashes
+        # Python-int views of the same (possibly memory-mapped) buffers: no NumPy scalar overhead per probe
+        self._bloom_view = memoryview(np.ascontiguousarray(bloom)).cast("B")
+        self._table_views = {name: memoryview(np.ascontiguousarray(table, dtype=np.uint64)).cast("B").cast("Q")
+                             for name, table in tables.items()}
+        self._lock = threading.Lock()
+        self.hits = {}  # (source, match) -> count
+        self.misses = 0
+
+    @classmethod
+    def from_parts(cls, parts):
+        """Merge per-source tables; a URL labelled both ways by the datasets is dropped from both"""
+        tables = {}
+        for name in TABLES:
+            arrays = [part[name] for part in parts if name in part]
+            tables[name] = np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.uint64)
+        conflicts = np.intersect1d(tables["phishing_url"], tables["legitimate_url"], assume_unique=True)
+        if len(conflicts):
+            tables["phishing_url"] = np.setdiff1d(tables["phishing_url"], conflicts, assume_unique=True)
+            tables["legitimate_url"] = np.setdiff1d(tables["legitimate_url"], conflicts, assume_unique=True)
+
+        keys = np.unique(np.concatenate([tables[name] for name in TABLES]))
+        bits = max(64, len(keys) * BLOOM_BITS_PER_KEY + 7) // 8 * 8
+        bloom = np.zeros(bits // 8, dtype=np.uint8)
+        positions = _bloom_positions(keys, bits, BLOOM_HASHES).ravel()
+        np.bitwise_or.at(bloom, (positions >> np.uint64(3)).astype(np.intp),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+        return cls(tables, bloom)
+
+    @classmethod
+    def build(cls, directory, sources):
+        """Index of `sources` ((kind, path) pairs) saved in `directory`, re-reading only changed sources.
+
+        With directory=None everything is read and kept in memory.
+        """
+        if directory is None:
+            return cls.from_parts([_read_source(kind, path) for kind, path in sources])
+        if cls.is_current(directory, sources):
+            return cls.load(directory)
+
+        parts_dir = os.path.join(directory, PARTS_DIR)
+        os.makedirs(parts_dir, exist_ok=True)
+        try:
+            with open(os.path.join(directory, INDEX_FILE)) as f:
+                recorded = json.load(f).get("sources", {})
+        except (OSError, ValueError):
+            recorded = {}
+
+        parts, signatures, reread = [], {}, 0
+        for kind, path in sources:
+            source = _source_id(kind, path)
+            signature = _file_signature(path)
+            part_path = os.path.join(parts_dir, hashlib.sha1(source.encode("utf-8")).hexdigest()[:16] + ".npz")
+            part = None
+            if recorded.get(source) == signature and os.path.exists(part_path):
+                with np.load(part_path) as cached:
+                    part = {name: cached[name] for name in cached.files}
+            if part is None:
+                part = _read_source(kind, path)
+                _atomic_write(part_path, lambda f: np.savez(f, **part))
+                reread += 1
+            parts.append(part)
+            signatures[source] = signature
+
+        index = cls.from_parts(parts)
+        index.save(directory, signatures)
+        print(f"✅ Reputation index rebuilt in {directory} ({reread} of {len(sources)} source(s) re-read)")
+        return cls.load(directory)
+
+    def save(self, directory, signatures):
+        for name in TABLES:
+            _atomic_write(os.path.join(directory, f"{name}.npy"), lambda f, name=name: np.save(f, self.tables[name]))
+        _atomic_write(os.path.join(directory, "bloom.npy"), lambda f: np.save(f, self.bloom))
+        index = {
+            "tables": {name: int(len(self.tables[name])) for name in TABLES},
+            "bloom_hashes": self.bloom_hashes,
+            "sources": signatures,
+        }
+        # Written last, so a reader never sees an index pointing at missing arrays
+        _atomic_write(os.path.join(directory, INDEX_FILE), lambda f: f.write(json.dumps(index, indent=2).encode()))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Index saved by build(); with mmap the tables are read-only memory maps"""
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            index = json.load(f)
+        mode = "r" if mmap else None
+        tables = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in TABLES}
+        return cls(tables, np.load(os.path.join(directory, "bloom.npy"), mmap_mode=mode), index["bloom_hashes"])
+
+    @staticmethod
+    def is_current(directory, sources):
+        """True if `directory` holds an index built from exactly these versions of `sources`"""
+        try:
+            with open(os.path.join(directory, INDEX_FILE)) as f:
+                recorded = json.load(f)["sources"]
+            return recorded == {_source_id(kind, path): _file_signature(path) for kind, path in sources}
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _maybe_contains(self, key):
+        low, high = key & 0xFFFFFFFF, (key >> 32) | 1
+        for i in range(self.bloom_hashes):
+            position = (low + i * high) % self.bloom_bits
+            if not self._bloom_view[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    def _contains(self, table, key):
+        view = self._table_views[table]
+        i = bisect_left(view, key)
+        return i < len(view) and view[i] == key
+
+    def lookup(self, url):
+        """(label, source, match) for a known URL or host, None if the index knows nothing about it"""
+        candidates = {"url": [key for key in [url_key(url)] if self._maybe_contains(key)],
+                      "host": [key for key in host_keys(url) if self._maybe_contains(key)]}
+        verdict = None
+        if candidates["url"] or candidates["host"]:
+            for table, source, match, label in RULES:
+                if any(self._contains(table, key) for key in candidates[match]):
+                    verdict = (label, source, match)
+                    break
+        with self._lock:
+            if verdict is None:
+                self.misses += 1
+            else:
+                self.hits[verdict[1:]] = self.hits.get(verdict[1:], 0) + 1
+        return verdict
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tables": {name: int(len(self.tables[name])) for name in TABLES},
+                "bloom_bytes": int(len(self.bloom)),
+                "hits": {f"{source}_{match}": count for (source, match), count in sorted(self.hits.items())},
+                "misses": self.misses,
+            }
+
+
+if __name__ == "__main__":
+    # Build (incrementally) and check the index against the dataset it was built from:
+    #   python reputation_index.py [directory]
+    # Every training URL must come back with its label; unseen URLs must miss.
+    import time
+    from artifacts import REPUTATION_INDEX_DIR, reputation_sources
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else REPUTATION_INDEX_DIR
+    sources = reputation_sources()
+    started = time.perf_counter()
+    index = ReputationIndex.build(directory, sources)
+    print(f"Build/load: {(time.perf_counter() - started) * 1000:.1f} ms  {index.stats()['tables']}")
+
+    expected = {}
+    for kind, path in sources:
+        if kind == DATASET:
+            with open(path, encoding="utf-8", errors="replace", newline="") as f:
+                for row in csv.DictReader(f):
+                    expected.setdefault(canonicalize_url(row["url"]), set()).add(row["status"].strip().capitalize())
+    known = [url for url, labels in expected.items() if len(labels) == 1]
+    unseen = [url + "/unseen-" + str(i) for i, url in enumerate(known)]
+
+    started = time.perf_counter()
+    wrong = sum(1 for url in known if (index.lookup(url) or (None,))[0] != next(iter(expected[url])))
+    known_us = (time.perf_counter() - started) * 1e6 / max(1, len(known))
+    started = time.perf_counter()
+    false_hits = sum(1 for url in unseen if index.lookup(url) is not None)
+    unseen_us = (time.perf_counter() - started) * 1e6 / max(1, len(unseen))
+    print(f"Known URLs: {len(known)} ({wrong} wrong, {known_us:.1f} us/lookup)  "
+          f"unseen URLs: {len(unseen)} ({false_hits} hits, {unseen_us:.1f} us/lookup)")
+
+    if wrong or false_hits:
+        print("❌ Reputation index does not reproduce its sources")
+        sys.exit(1)
+    print("✅ Reputation index matches its sources")
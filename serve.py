@@ -0,0 +1,184 @@
+"""Production entry point for the Flask servers: pre-forked workers, each with a bounded thread pool.
+
+    python serve.py server_api --workers 8 --threads 8 --port 5000
+    python serve.py new_server_api --workers 4
+
+The parent process binds the socket and imports the app, so the models are
+loaded and warmed up once; the workers are forked from it and share those
+pages copy-on-write. The numpy backend (the default here, as TensorFlow is
+not fork-safe) memory-maps its weights from NUMPY_MODEL_DIR, so they stay one
+read-only copy in the page cache no matter how many workers run. With
+MODEL_BACKEND=keras and several workers, every worker imports the app (and
+TensorFlow) itself after the fork instead.
+
+Dead workers are restarted; SIGTERM/SIGINT stop the workers after their
+in-flight requests. Counters served at /metrics are per worker process.
+
+Defaults come from SERVE_WORKERS (CPU count), SERVE_THREADS (8),
+SERVE_HOST (127.0.0.1) and SERVE_PORT (5000); SERVE_ACCESS_LOG=1 turns on
+the per-request access log.
+"""
+import argparse
+import importlib
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+APPS = ("server_api", "new_server_api")
+
+# Seconds an idle keep-alive connection may hold a request thread
+KEEPALIVE_TIMEOUT = float(os.environ.get("SERVE_KEEPALIVE_TIMEOUT", 5))
+
+# Werkzeug's per-request access log (SERVE_ACCESS_LOG=1)
+ACCESS_LOG = os.environ.get("SERVE_ACCESS_LOG", "0") == "1"
+
+# A worker dying this soon after its start is treated as a startup failure, not respawned in a loop
+MIN_WORKER_UPTIME = 1.0
+
+
+class TimeoutRequestHandler(WSGIRequestHandler):
+    timeout = KEEPALIVE_TIMEOUT
+
+    def log_request(self, *args, **kwargs):
+        # Per-request access lines are off by default; /metrics has the counts and latencies
+        if ACCESS_LOG:
+            super().log_request(*args, **kwargs)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server handling each connection on a fixed-size thread pool (cf. socketserver.ThreadingMixIn)"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads, fd=None):
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="serve-request")
+        super().__init__(host, port, app, handler=TimeoutRequestHandler, fd=fd)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def load_app(name):
+    return importlib.import_module(name).app
+
+
+def run_worker(app_name, app, sock, threads):
+    """Serve on the inherited listening socket until SIGTERM/SIGINT; never returns"""
+    if app is None:
+        app = load_app(app_name)
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(host, port, app, threads, fd=sock.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever, which runs on this (the main) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.pool.shutdown(wait=True)  # let in-flight requests finish
+        server.server_close()
+    os._exit(0)
+
+
+def spawn_worker(app_name, app, sock, threads):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app_name, app, sock, threads)
+        except BaseException:
+            print(f"❌ Worker {os.getpid()} failed:")
+            traceback.print_exc()
+        finally:
+            os._exit(1)
+    return pid
+
+
+def serve(app_name, workers, threads, host, port, preload=None):
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    if preload is None:
+        preload = workers == 1 or os.environ.get("MODEL_BACKEND", "keras").lower() != "keras"
+    app = load_app(app_name) if preload else None
+    print(f"✅ Serving {app_name} on http://{host}:{port} with {workers} worker(s) x {threads} thread(s)"
+          f"{' (models preloaded)' if preload else ''}")
+
+    if workers == 1:
+        run_worker(app_name, app, sock, threads)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    children = {spawn_worker(app_name, app, sock, threads): time.monotonic() for _ in range(workers)}
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            print(f"❌ Worker {pid} exited during startup (status {status}); shutting down")
+            stop(None, None)
+            continue
+        print(f"⚠️ Worker {pid} exited (status {status}); starting a replacement")
+        children[spawn_worker(app_name, app, sock, threads)] = time.monotonic()
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve server_api or new_server_api with pre-forked workers")
+    parser.add_argument("app", choices=APPS, nargs="?", default="server_api")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVE_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("SERVE_THREADS", 8)))
+    parser.add_argument("--host", default=os.environ.get("SERVE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SERVE_PORT", 5000)))
+    preload = parser.add_mutually_exclusive_group()
+    preload.add_argument("--preload", dest="preload", action="store_true", default=None,
+                         help="load the app before forking (default unless the keras backend runs several workers)")
+    preload.add_argument("--no-preload", dest="preload", action="store_false")
+    args = parser.parse_args()
+
+    # TensorFlow-free, fork-safe and memory-mapped; MODEL_BACKEND=keras to opt out
+    os.environ.setdefault("MODEL_BACKEND", "numpy")
+    # The servers import artifacts.py and the frontend relative to the repo root
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    serve(args.app, max(1, args.workers), max(1, args.threads), args.host, args.port, args.preload)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,222 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import numpy as np
-import tensorflow as tf
 import os
-import sys
-import joblib
-sys.path.append(os.path.abspath("ml-model/Data-Processing-Script"))
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from artifacts import registry, track_first_request, MODEL_PATH, SCALER_PATH  # also puts Data-Processing-Script on sys.path
 from preprocess_data_30_feature import extract_enhanced_features
+from prediction_cache import cache_from_env
+from serving_metrics import ServingMetrics, install_metrics
+from cascade import CascadeClassifier, CascadeConfigError, network_stage
 
 app = Flask(__name__)
 CORS(app)
+track_first_request(app, registry)
+# Request counts and per-stage latency histograms, served at /metrics
+metrics = install_metrics(app, ServingMetrics())
 
-# Path to the final trained model
-MODEL_PATH = os.path.join("ml-model/Trained-Model", "final_30_features_model.h5")
-SCALER_PATH = os.path.join("ml-model/Trained-Model", "standard_scaler.pkl")
+# Inference backend: "keras" (TensorFlow) or "numpy" (TensorFlow-free, see numpy_inference.py)
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "keras").lower()
 
-# Load the trained model once when the app starts
-try:
-    model = tf.keras.models.load_model(MODEL_PATH)
-    print("✅ Model loaded successfully from", MODEL_PATH)
-except Exception as e:
-    print("❌ Failed to load model:", e)
-    model = None
 # Load the StandardScaler
 try:
-    scaler = joblib.load(SCALER_PATH)
+    scaler = registry.get("scaler")
     print("✅ Scaler loaded successfully from", SCALER_PATH)
 except Exception as e:
     print("❌ Failed to load scaler:", e)
     scaler = None
 
+# Load the trained model once when the app starts and run a warmup inference.
+# The numpy backend has the scaler folded into its first layer, so it takes raw features.
+try:
+    model = registry.warmup("numpy_model" if MODEL_BACKEND == "numpy" else "keras_model")
+    print("✅ Model loaded successfully from", MODEL_PATH, "({} backend)".format(MODEL_BACKEND))
+except Exception as e:
+    print("❌ Failed to load model:", e)
+    model = None
+
+# Known URLs / hosts answered from the reputation index before feature extraction (REPUTATION_INDEX=1)
+reputation = None
+if os.environ.get("REPUTATION_INDEX", "0") == "1":
+    try:
+        reputation = registry.get("reputation_index")
+        print("✅ Reputation index loaded:", reputation.stats()["tables"])
+    except Exception as e:
+        print("❌ Failed to load reputation index:", e)
+
+registry.mark_ready()
+print("⏱️ Startup:", registry.report())
+
+
+# Keras' predict is not safe to call from several threads at once; the numpy backend needs no lock
+model_lock = threading.Lock()
+
+# Upper bound on the number of URLs accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_BATCH_MAX_SIZE", 256))
+
+
+def predict_proba(features_array):
+    """Scale an (N, 30) feature array and return one phishing probability per row"""
+    if MODEL_BACKEND == "numpy":
+        with metrics.stage("inference"):
+            return model.predict(features_array)[:, 0]
+    with metrics.stage("scaling"):
+        features_scaled = scaler.transform(features_array)
+    with metrics.stage("inference"), model_lock:
+        return model.predict(features_scaled, verbose=0)[:, 0]
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-URL predictions into one predict_proba call.
+
+    Requests wait at most `window_ms` (or until `max_batch_size` rows are
+    queued), are stacked into one array and scored together; each caller
+    gets its own row back.
+    """
+
+    def __init__(self, predict_fn, window_ms=3.0, max_batch_size=64):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._largest_batch = 0
+        self._batch_sizes = {}
+        self._start_worker()
+        # Threads do not survive fork, so every pre-forked worker process (serve.py) starts its own
+        os.register_at_fork(after_in_child=self._start_worker)
+
+    def _start_worker(self):
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="predict-microbatcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, features):
+        """Queue one 30-feature row and return a Future for its probability"""
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def predict(self, features, timeout=None):
+        return self.submit(features).result(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        try:
+            rows = np.array([features for features, _ in batch], dtype=float)
+            probabilities = self.predict_fn(rows)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), prediction_prob in zip(batch, probabilities):
+                future.set_result(prediction_prob)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "window_ms": self.window * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "batches": self._batches,
+                "requests": self._requests,
+                "mean_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "batch_size_counts": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                "queued": self._queue.qsize(),
+            }
+
+
+def format_prediction(prediction_prob):
+    label = "Phishing" if prediction_prob >= 0.5 else "Legitimate"
+    return {
+        "probability": round(float(prediction_prob), 2),
+        "label": label
+    }
+
+
+def reputation_verdict(url):
+    """Response for a URL (or host) the reputation index knows, None otherwise"""
+    if reputation is None:
+        return None
+    with metrics.stage("reputation"):
+        verdict = reputation.lookup(url)
+    if verdict is None:
+        metrics.increment("reputation_lookups", result="miss")
+        return None
+    label, source, match = verdict
+    metrics.increment("reputation_lookups", result="hit", source=source, match=match)
+    result = format_prediction(1.0 if label == "Phishing" else 0.0)
+    result["source"] = "reputation"
+    result["reputation_match"] = "{}_{}".format(source, match)
+    return result
+
+
+# Optional request coalescing for /predict (off unless PREDICT_MICROBATCH=1)
+batcher = None
+if os.environ.get("PREDICT_MICROBATCH", "0") == "1" and model is not None and scaler is not None:
+    batcher = MicroBatcher(
+        predict_proba,
+        window_ms=float(os.environ.get("PREDICT_MICROBATCH_WINDOW_MS", 3.0)),
+        max_batch_size=int(os.environ.get("PREDICT_MICROBATCH_MAX_SIZE", 64)),
+    )
+    print("✅ Micro-batching enabled:", batcher.window * 1000.0, "ms window, max", batcher.max_batch_size, "rows")
+
+
+# LRU + TTL cache of responses keyed by the exact URL (disable with PREDICT_CACHE=0)
+prediction_cache = cache_from_env("PREDICT_CACHE")
+
+
+# Optional /predict/cascade (CASCADE=1): this lexical model first, and new_server_api's WHOIS/page
+# features + PyCaret model only for URLs whose probability falls in [CASCADE_LOW, CASCADE_HIGH]
+cascade = None
+cascade_cache = None
+if os.environ.get("CASCADE", "0") == "1" and model is not None and scaler is not None:
+    try:
+        import featureExtractor
+
+        def observe_lookup(stage, seconds, failed):
+            metrics.observe(stage, seconds)
+            if failed:
+                metrics.record_error("/predict/cascade", stage)
+
+        featureExtractor.stageObserver = observe_lookup
+        try:
+            band = float(os.environ.get("CASCADE_LOW", 0.2)), float(os.environ.get("CASCADE_HIGH", 0.8))
+        except ValueError as e:
+            raise CascadeConfigError(f"CASCADE_LOW/CASCADE_HIGH must be numbers: {e}") from e
+        cascade = CascadeClassifier(predict_proba, network_stage(registry, metrics), low=band[0], high=band[1])
+        cascade_cache = cache_from_env("CASCADE_CACHE")
+        print("✅ Cascade enabled: network stage for lexical probabilities in", [cascade.low, cascade.high])
+    except CascadeConfigError as e:
+        # CASCADE=1 with a model it cannot use is a configuration error, not a reason to run without it
+        print("❌ Cascade misconfigured:", e)
+        raise
+    except Exception as e:
+        print("❌ Failed to enable the cascade:", e)
+
 
 @app.route("/predict", methods=["POST"])
 def predict():
@@ -43,34 +230,159 @@ def predict():
     if not url:
         return jsonify({"error": "Missing 'url' in request."}), 400
 
+    known = reputation_verdict(url)
+    if known is not None:
+        return jsonify(known)
+
+    if prediction_cache is not None:
+        cached = prediction_cache.get(url)
+        if cached is not None:
+            return jsonify(cached)
+
     try:
         # Extract features from the URL using your logic
-        features = extract_enhanced_features(url)
-        print("Extracted features:", features)
-
+        with metrics.stage("extraction"):
+            features = extract_enhanced_features(url)
 
         if len(features) != 30:
             return jsonify({"error": "Expected 30 features, got {}.".format(len(features))}), 400
 
-        features_array = np.array([features], dtype=float)  # Shape: (1, 30)
+        if batcher is not None:
+            # Scored together with other in-flight requests
+            prediction_prob = batcher.predict(features)
+        else:
+            features_array = np.array([features], dtype=float)  # Shape: (1, 30)
 
-        # Feature scaling
-        features_scaled = scaler.transform(features_array)
+            # Feature scaling + inference
+            prediction_prob = predict_proba(features_array)[0]  # Get the single probability value
+
+        result = format_prediction(prediction_prob)
+        if prediction_cache is not None:
+            prediction_cache.put(url, result)
+        with metrics.stage("serialization"):
+            return jsonify(result)
+
+    except Exception as e:
+        print(f"Error in prediction: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    global model, scaler
+    if model is None or scaler is None:
+        return jsonify({"error": "Model not loaded."}), 500
 
-        prediction_prob = model.predict(features_array)[0][0]  # Get the single probability value
+    data = request.get_json(silent=True) or {}
+    urls = data.get("urls")
 
-        label = "Phishing" if prediction_prob >= 0.5 else "Legitimate"
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "Missing 'urls' list in request."}), 400
+    if len(urls) > MAX_BATCH_SIZE:
+        return jsonify({"error": "At most {} URLs per batch, got {}.".format(MAX_BATCH_SIZE, len(urls))}), 413
 
-        return jsonify({
-            "probability": round(float(prediction_prob), 2),
-            "label": label
-        })
+    # Per-URL results, in request order; failed URLs get their own error entry
+    results = [None] * len(urls)
+    rows = []
+    row_positions = []
+
+    for i, url in enumerate(urls):
+        if not isinstance(url, str) or not url:
+            results[i] = {"url": url, "error": "Invalid URL."}
+            continue
+        known = reputation_verdict(url)
+        if known is not None:
+            results[i] = {"url": url, **known}
+            continue
+        cached = prediction_cache.get(url) if prediction_cache is not None else None
+        if cached is not None:
+            results[i] = {"url": url, **cached}
+            continue
+        with metrics.stage("extraction"):
+            features = extract_enhanced_features(url)
+        # extract_enhanced_features returns a dict of zeros when parsing fails
+        if not isinstance(features, list) or len(features) != 30:
+            results[i] = {"url": url, "error": "Feature extraction failed."}
+            continue
+        rows.append(features)
+        row_positions.append(i)
+
+    if rows:
+        try:
+            # One scaler.transform and one model.predict for the whole batch
+            probabilities = predict_proba(np.array(rows, dtype=float))  # Shape: (N,)
+        except Exception as e:
+            print(f"Error in batch prediction: {e}")
+            import traceback
+            traceback.print_exc()
+            return jsonify({"error": str(e)}), 500
+
+        for i, prediction_prob in zip(row_positions, probabilities):
+            result = format_prediction(prediction_prob)
+            if prediction_cache is not None:
+                prediction_cache.put(urls[i], result)
+            results[i] = {"url": urls[i], **result}
+
+    with metrics.stage("serialization"):
+        return jsonify({"results": results})
+
+
+@app.route("/predict/cascade", methods=["POST"])
+def predict_cascade():
+    if cascade is None:
+        return jsonify({"error": "Cascade not enabled (set CASCADE=1)."}), 503
+
+    data = request.get_json(silent=True) or {}
+    url = data.get("url")
+
+    if not url:
+        return jsonify({"error": "Missing 'url' in request."}), 400
+
+    known = reputation_verdict(url)
+    if known is not None:
+        return jsonify(known)
+
+    if cascade_cache is not None:
+        cached = cascade_cache.get(url)
+        if cached is not None:
+            return jsonify(cached)
+
+    try:
+        with metrics.stage("extraction"):
+            features = extract_enhanced_features(url)
+        if not isinstance(features, list) or len(features) != 30:
+            return jsonify({"error": "Feature extraction failed."}), 400
+
+        prediction_prob, stage, lexical_prob = cascade.classify(url, features)
+        metrics.increment("cascade_decisions", stage=stage)
+
+        result = format_prediction(prediction_prob)
+        result["stage"] = stage
+        result["lexical_probability"] = round(lexical_prob, 2) if lexical_prob == lexical_prob else None
+        if cascade_cache is not None:
+            cascade_cache.put(url, result)
+        with metrics.stage("serialization"):
+            return jsonify(result)
 
     except Exception as e:
-        print(f"Error in prediction: {e}")
+        print(f"Error in cascade prediction: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+
+@app.route("/predict/stats", methods=["GET"])
+def predict_stats():
+    stats = {"micro_batching": batcher is not None}
+    if batcher is not None:
+        stats.update(batcher.stats())
+    stats["cache"] = prediction_cache.stats() if prediction_cache is not None else None
+    stats["cascade"] = cascade.stats() if cascade is not None else None
+    stats["reputation"] = reputation.stats() if reputation is not None else None
+    stats["startup"] = registry.report()
+    return jsonify(stats)
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,186 @@
+"""Request counters and per-stage latency histograms in Prometheus text format, shared by both Flask servers.
+
+Dependency-free: a histogram is a fixed bucket list plus a lock, so observing
+a value costs one bisect and a few additions. Stages used by the servers:
+
+    reputation      reputation index lookup (server_api, before extraction)
+    extraction      whole feature extraction for one URL
+    whois           WHOIS lookup (new_server_api)
+    http_fetch      live page fetch (new_server_api)
+    scaling         StandardScaler.transform (server_api, keras backend)
+    inference       model prediction
+    serialization   building the JSON response
+    network_extraction / network_inference
+                    second stage of the cascade (server_api /predict/cascade)
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds; wide enough for both sub-millisecond model calls and slow network lookups
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Bucketed latency distribution for one label set"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot: above the largest bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f"{name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}"
+        yield f"{name}_sum{_format_labels(labels)} {_format_value(self.sum)}"
+        yield f"{name}_count{_format_labels(labels)} {self.count}"
+
+
+class ServingMetrics:
+    """Thread-safe request counters and per-stage / per-endpoint latency histograms"""
+
+    def __init__(self, prefix="phishing", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = {}  # (endpoint, method, status) -> count
+        self._errors = {}  # (endpoint, kind) -> count
+        self._request_seconds = {}  # endpoint -> Histogram
+        self._stage_seconds = {}  # stage -> Histogram
+        self._counters = {}  # (name, sorted label items) -> count
+        self.started = time.time()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stage_seconds.get(stage)
+            if histogram is None:
+                histogram = self._stage_seconds[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one observation of `name` (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def record_request(self, endpoint, method, status, seconds):
+        with self._lock:
+            key = (endpoint, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._request_seconds.get(endpoint)
+            if histogram is None:
+                histogram = self._request_seconds[endpoint] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if status >= 500:
+                self._count_error(endpoint, "server_error")
+            elif status >= 400:
+                self._count_error(endpoint, "client_error")
+
+    def record_error(self, endpoint, kind):
+        """Count a failure that did not surface as an error status (e.g. a lookup that timed out)"""
+        with self._lock:
+            self._count_error(endpoint, kind)
+
+    def increment(self, name, amount=1, **labels):
+        """Add to the free-form counter <prefix>_<name>_total{labels}"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _count_error(self, endpoint, kind):
+        self._errors[(endpoint, kind)] = self._errors.get((endpoint, kind), 0) + 1
+
+    def render(self):
+        """Everything recorded so far, in Prometheus text exposition format (0.0.4)"""
+        p = self.prefix
+        with self._lock:
+            lines = [
+                f"# HELP {p}_requests_total Requests served, by endpoint, method and status.",
+                f"# TYPE {p}_requests_total counter",
+            ]
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f"{p}_requests_total"
+                             f"{_format_labels({'endpoint': endpoint, 'method': method, 'status': status})} {count}")
+
+            lines += [
+                f"# HELP {p}_errors_total Failed requests and failed lookups, by endpoint and kind.",
+                f"# TYPE {p}_errors_total counter",
+            ]
+            for (endpoint, kind), count in sorted(self._errors.items()):
+                lines.append(f"{p}_errors_total{_format_labels({'endpoint': endpoint, 'kind': kind})} {count}")
+
+            lines += [
+                f"# HELP {p}_request_duration_seconds End-to-end request latency, by endpoint.",
+                f"# TYPE {p}_request_duration_seconds histogram",
+            ]
+            for endpoint, histogram in sorted(self._request_seconds.items()):
+                lines.extend(histogram.samples(f"{p}_request_duration_seconds", {"endpoint": endpoint}))
+
+            lines += [
+                f"# HELP {p}_stage_duration_seconds Latency of each processing stage.",
+                f"# TYPE {p}_stage_duration_seconds histogram",
+            ]
+            for stage, histogram in sorted(self._stage_seconds.items()):
+                lines.extend(histogram.samples(f"{p}_stage_duration_seconds", {"stage": stage}))
+
+            described = set()
+            for (name, labels), count in sorted(self._counters.items()):
+                if name not in described:
+                    lines.append(f"# TYPE {p}_{name}_total counter")
+                    described.add(name)
+                lines.append(f"{p}_{name}_total{_format_labels(dict(labels))} {count}")
+
+        lines += [
+            f"# HELP {p}_process_start_time_seconds Start time of the process since the epoch.",
+            f"# TYPE {p}_process_start_time_seconds gauge",
+            f"{p}_process_start_time_seconds {_format_value(self.started)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def install_metrics(app, metrics, path="/metrics"):
+    """Count and time every request of a Flask app and serve metrics.render() at `path`"""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _record_metrics(response):
+        if "metrics_started" in g and request.path != path:
+            # Route rule rather than raw path, so label cardinality stays bounded
+            endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            metrics.record_request(endpoint, request.method, response.status_code,
+                                   time.perf_counter() - g.metrics_started)
+        return response
+
+    @app.route(path, methods=["GET"])
+    def metrics_endpoint():
+        return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return metrics
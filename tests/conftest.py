@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The tests import the serving modules from the repo root and the feature extractors from
+# ml-model/Data-Processing-Script, the same way artifacts.py sets up sys.path for the servers
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PROCESSING_DIR = os.path.join(ROOT_DIR, "ml-model", "Data-Processing-Script")
+for path in (ROOT_DIR, DATA_PROCESSING_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
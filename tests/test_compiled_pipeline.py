@@ -0,0 +1,76 @@
+"""CompiledPipeline parity with the PyCaret pipeline's predict / predict_proba (skipped without pycaret)."""
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pycaret")
+
+from compiled_pipeline import CompiledPipeline
+
+TRAINING_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "ml-model", "Training-Dataset", "training_dataset_1.csv")
+
+
+@pytest.fixture(scope="module")
+def feature_rows():
+    """Feature rows of the training URLs, with the WHOIS/page columns cycled through their values
+    and NaN in an imputed column every 97 rows (no network needed)"""
+    from featureExtractor import FEATURE_NAMES, buildFeatureValues, projectDom
+
+    urls = pd.read_csv(TRAINING_PATH)["url"].astype(str).tolist()
+    combos = list(itertools.product([0, 1], [0, 1], itertools.product([0, 1], repeat=3)))
+    rows = []
+    for i, url in enumerate(urls):
+        row = buildFeatureValues(url, 1, "", "")
+        domain_age, domain_end, dom = combos[i % len(combos)]
+        row[FEATURE_NAMES.index("Domain_Age")] = domain_age
+        row[FEATURE_NAMES.index("Domain_End")] = domain_end
+        row[FEATURE_NAMES.index("domain_att")] = projectDom(dom)
+        if i % 97 == 0:
+            row[FEATURE_NAMES.index("URL_Depth")] = np.nan
+        rows.append(row)
+    return np.array(rows, dtype=np.float64), FEATURE_NAMES
+
+
+def assert_parity(pipeline, X, feature_names):
+    frame = pd.DataFrame(X, columns=feature_names)
+    compiled = CompiledPipeline.from_pipeline(pipeline, feature_names)
+
+    np.testing.assert_array_equal(compiled.classes, np.asarray(pipeline.classes_))
+    np.testing.assert_allclose(compiled.predict_proba(X), np.asarray(pipeline.predict_proba(frame)),
+                               rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(compiled.predict(X), np.asarray(pipeline.predict(frame)))
+    return compiled
+
+
+def test_shipped_pipeline_matches(feature_rows):
+    from artifacts import registry
+
+    X, feature_names = feature_rows
+    assert_parity(registry.get("phishingdetection"), X, feature_names)
+
+
+def test_label_encoded_target_matches(feature_rows):
+    """String targets add a LabelEncoder step: predict_proba columns follow the encoded classes,
+    predict returns the original labels"""
+    lightgbm = pytest.importorskip("lightgbm")
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+    from pycaret.internal.pipeline import Pipeline
+    from pycaret.internal.preprocess.transformers import TransformerWrapper, TransformerWrapperWithInverse
+
+    X, feature_names = feature_rows
+    frame = pd.DataFrame(X, columns=feature_names)
+    target = pd.Series(np.where(np.arange(len(X)) % 3 == 0, "phishing", "legitimate"), name="status")
+    pipeline = Pipeline([
+        ("label_encoding", TransformerWrapperWithInverse(LabelEncoder())),
+        ("numerical_imputer", TransformerWrapper(SimpleImputer(strategy="mean"))),
+        ("normalize", TransformerWrapper(StandardScaler())),
+        ("trained_model", lightgbm.LGBMClassifier(n_estimators=20, verbose=-1)),
+    ]).fit(frame, target)
+
+    compiled = assert_parity(pipeline, X, feature_names)
+    assert list(compiled.class_labels) == ["legitimate", "phishing"]
@@ -0,0 +1,44 @@
+"""NumPy backend parity with Keras on the processed training data."""
+import os
+
+import numpy as np
+import pytest
+
+from artifacts import MODEL_PATH, ROOT_DIR, SCALER_PATH
+from numpy_inference import NumpyMLP
+
+PROCESSED_PATH = os.path.join(ROOT_DIR, "ml-model", "Processed-Data", "processed_training_dataset_30.csv")
+
+
+@pytest.fixture(scope="module")
+def parity_outputs():
+    tf = pytest.importorskip("tensorflow")
+    joblib = pytest.importorskip("joblib")
+    import pandas as pd
+
+    scaler = joblib.load(SCALER_PATH)
+    X = pd.read_csv(PROCESSED_PATH).iloc[:, :-1].values.astype(float)
+    keras_probs = tf.keras.models.load_model(MODEL_PATH).predict(scaler.transform(X), verbose=0)[:, 0]
+    numpy_probs = NumpyMLP.load(MODEL_PATH, scaler=scaler).predict(X)[:, 0]
+    return keras_probs, numpy_probs
+
+
+def test_probabilities_match_keras(parity_outputs):
+    keras_probs, numpy_probs = parity_outputs
+    assert np.allclose(numpy_probs, keras_probs, rtol=1e-5, atol=1e-6, equal_nan=True)
+
+
+def test_labels_match_keras(parity_outputs):
+    keras_probs, numpy_probs = parity_outputs
+    np.testing.assert_array_equal(numpy_probs >= 0.5, keras_probs >= 0.5)
+
+
+def test_memory_mapped_export_matches(parity_outputs, tmp_path):
+    joblib = pytest.importorskip("joblib")
+    import pandas as pd
+
+    model = NumpyMLP.load(MODEL_PATH, scaler=joblib.load(SCALER_PATH))
+    model.save(str(tmp_path), sources=[MODEL_PATH, SCALER_PATH])
+    assert NumpyMLP.export_is_current(str(tmp_path), [MODEL_PATH, SCALER_PATH])
+    X = pd.read_csv(PROCESSED_PATH).iloc[:, :-1].values.astype(float)
+    np.testing.assert_array_equal(NumpyMLP.load_arrays(str(tmp_path)).predict(X)[:, 0], parity_outputs[1])